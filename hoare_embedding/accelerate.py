@@ -0,0 +1,241 @@
+import weakref
+from dataclasses import dataclass
+from math import comb
+from typing import Callable, Dict, List, Optional, Tuple
+
+from compiler import Compiled, _compile, _flatten_seq
+from hoare import State, Stmt
+from symbolic import Sym, SymState, Untraceable, trace
+
+# Loop acceleration
+# =================
+# ADD, MUL and GAUSS loop a number of times that is known on entry, and
+# their bodies only add polynomials to the variables. Such a loop can
+# jump straight to its exit state instead of running every iteration:
+#
+# - The body is traced (symbolic.py) into one update per variable, in
+#   terms of the values at the start of the iteration. Every update
+#   must have the form x := x + p, where p is a polynomial that does
+#   not mention x, and no two variables may depend on each other that
+#   way. Then x after k iterations is a polynomial in k. Its degree is
+#   1 + the degree of p, where a variable the body does not change
+#   counts as a constant.
+#
+# - The condition must compare two polynomials whose difference g has
+#   degree at most 1 in k. g(k) = g(0) + d*k then gives the iteration
+#   count directly.
+#
+# - After k iterations, every variable is found with Newton's forward
+#   differences. The body runs D times, D being the highest degree,
+#   which gives v(0), ..., v(D). Then v(k) = sum_j C(k, j) Δ^j v(0).
+#
+# Loops that do not fit, or that would not terminate, run as usual.
+#
+#     run = accelerate(GAUSS)
+#     run({})   # N iterations in O(1)
+
+# loops whose variables grow faster than this run as usual
+MAX_DEGREE = 6
+
+# Polynomials map monomials (sorted tuples of variable names, () for the
+# constant) to integer coefficients
+Poly = Dict[Tuple[str, ...], int]
+
+class NotPolynomial(Exception):
+    pass
+
+def _add(p: Poly, q: Poly, sign: int = 1) -> Poly:
+    out = dict(p)
+    for m, c in q.items():
+        out[m] = out.get(m, 0) + sign * c
+        if out[m] == 0:
+            del out[m]
+    return out
+
+def _mul(p: Poly, q: Poly) -> Poly:
+    out: Poly = {}
+    for m1, c1 in p.items():
+        for m2, c2 in q.items():
+            m = tuple(sorted(m1 + m2))
+            out[m] = out.get(m, 0) + c1 * c2
+            if out[m] == 0:
+                del out[m]
+    return out
+
+def polynomial(e: Sym) -> Poly:
+    op = e.op
+    if op == "var":
+        return {(e.args[0],): 1}
+    if op == "const":
+        value = e.args[0]
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise NotPolynomial(repr(value))
+        return {(): value} if value else {}
+    if op == "neg":
+        return _mul({(): -1}, polynomial(e.args[0]))
+    if op == "+":
+        return _add(polynomial(e.args[0]), polynomial(e.args[1]))
+    if op == "-":
+        return _add(polynomial(e.args[0]), polynomial(e.args[1]), -1)
+    if op == "*":
+        return _mul(polynomial(e.args[0]), polynomial(e.args[1]))
+    raise NotPolynomial(op)
+
+def evaluate_poly(p: Poly, state: State) -> int:
+    total = 0
+    for m, c in p.items():
+        term = c
+        for name in m:
+            term *= state[name]
+        total += term
+    return total
+
+def _assignments(body: Stmt) -> Optional[List[Tuple[str, Callable[[State], int]]]]:
+    stmts: List[Stmt] = []
+    _flatten_seq(body, stmts)
+    none = lambda *args: None
+    steps = [s.match(skip=lambda: (), assign=lambda x, a: (x, a), seq=none, if_then_else=none, while_do=none)
+             for s in stmts]
+    if any(step is None for step in steps):
+        return None
+    return [step for step in steps if step]
+
+def _degrees(deltas: Dict[str, Poly]) -> Optional[Dict[str, int]]:
+    # degree in k of every variable the body changes
+    degrees: Dict[str, int] = {}
+    visiting = set()
+
+    def degree(name: str) -> int:
+        if name not in deltas:
+            return 0
+        if name in degrees:
+            return degrees[name]
+        if name in visiting:
+            raise NotPolynomial(f"{name} depends on itself")
+        visiting.add(name)
+        delta = deltas[name]
+        degrees[name] = 0 if not delta else 1 + max(sum(degree(v) for v in m) for m in delta)
+        return degrees[name]
+
+    try:
+        for name in deltas:
+            degree(name)
+    except NotPolynomial:
+        return None
+    return degrees
+
+_FLIP = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "==": "==", "!=": "!="}
+
+@dataclass
+class ClosedForm:
+    # the loop runs while `guard op 0`
+    guard: Poly
+    op: str
+    degree: int
+
+    def iterations(self, state: State, after_one: Callable[[], State]) -> Optional[int]:
+        """How often the loop runs from `state`, or None if forever."""
+        g0 = evaluate_poly(self.guard, state)
+        if not _holds(self.op, g0):
+            return 0
+        d = evaluate_poly(self.guard, after_one()) - g0
+        op = self.op
+        if op in (">", ">="):
+            g0, d, op = -g0, -d, _FLIP[op]
+        if op == "==":
+            return None if d == 0 else 1
+        if op == "!=":
+            if d == 0 or g0 % d != 0 or -g0 // d < 0:
+                return None
+            return -g0 // d
+        if d <= 0:
+            return None
+        if op == "<":
+            return -(g0 // d)
+        return -g0 // d + 1
+
+def _holds(op: str, g: int) -> bool:
+    return {"<": g < 0, "<=": g <= 0, ">": g > 0, ">=": g >= 0, "==": g == 0, "!=": g != 0}[op]
+
+def closed_form(b: Callable[[State], bool], s: Stmt) -> Optional[ClosedForm]:
+    """The closed form of `while b do s`, or None if it has none."""
+    steps = _assignments(s)
+    if steps is None:
+        return None
+    try:
+        # one update per variable, over the values at the start of the body
+        updates: Dict[str, Sym] = {}
+        for x, a in steps:
+            updates[x] = trace(a, SymState(values=dict(updates)), max_paths=1)
+        deltas = {x: _add(polynomial(e), {(x,): 1}, -1) for x, e in updates.items()}
+        cond = trace(b, SymState(), max_paths=1)
+    except (Untraceable, NotPolynomial):
+        return None
+    if any(x in m for x, delta in deltas.items() for m in delta):
+        return None
+    degrees = _degrees(deltas)
+    if degrees is None or max(degrees.values(), default=0) > MAX_DEGREE:
+        return None
+
+    if cond.op not in _FLIP:
+        return None
+    try:
+        guard = _add(polynomial(cond.args[0]), polynomial(cond.args[1]), -1)
+    except NotPolynomial:
+        return None
+    if any(sum(degrees.get(v, 0) for v in m) > 1 for m in guard):
+        return None
+    return ClosedForm(guard, cond.op, max(degrees.values(), default=0))
+
+def jump(form: ClosedForm, body: Compiled, state: State, k: int) -> State:
+    """The state after `k` runs of `body`, from `degree + 1` of them."""
+    samples = [state]
+    for _ in range(min(k, form.degree)):
+        samples.append(body(samples[-1]))
+    if k <= form.degree:
+        return samples[k]
+
+    out = dict(samples[-1])
+    for name in samples[-1]:
+        column = [sample.get(name) for sample in samples]
+        if None in column or len(set(column)) == 1:
+            continue
+        # forward differences Δ^j v(0)
+        value = 0
+        j = 0
+        while column:
+            value += comb(k, j) * column[0]
+            column = [b - a for a, b in zip(column, column[1:])]
+            j += 1
+        out[name] = value
+    return out
+
+def _compile_accelerated(b: Callable[[State], bool], s: Stmt,
+                         compile_while: Callable[..., Compiled]) -> Compiled:
+    body = _compile(s, compile_while)
+    form = closed_form(b, s)
+
+    def run(state: State) -> State:
+        if form is not None:
+            k = form.iterations(state, lambda: body(state))
+            if k is not None:
+                return jump(form, body, state, k)
+        while b(state):
+            state = body(state)
+        return state
+    return run
+
+_accelerated: "weakref.WeakKeyDictionary[Stmt, Compiled]" = weakref.WeakKeyDictionary()
+
+def accelerate(stmt: Stmt) -> Compiled:
+    """
+    Like `compile_stmt`, but loops with a closed form jump to their exit
+    state.
+    """
+    run = _accelerated.get(stmt)
+    if run is None:
+        run = _accelerated[stmt] = _compile(stmt, _compile_accelerated)
+    return run
+
+def evaluate_accelerated(stmt: Stmt, state: State) -> State:
+    return accelerate(stmt)(state)
@@ -0,0 +1,127 @@
+import weakref
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from hoare import State, Stmt
+from kernels import kernel_for
+
+# Batched evaluation
+# ==================
+# Runs one program over many input states at once. The states are stored
+# struct-of-arrays: one int64 array per variable, one lane per state.
+# Every statement runs under a lane mask; IF_THEN_ELSE splits the mask,
+# and WHILE_DO iterates until no lane is still looping.
+#
+# Conditions and expressions are the same lambdas `evaluate` uses. They
+# run as NumPy kernels when they can be traced (kernels.py), or else are
+# called with the whole batch (so `s["n"] != 0` becomes an array
+# compare). Lambdas that do neither, e.g. recursive helpers, are
+# remembered and called lane by lane, as are kernels that need a variable
+# the batch does not have.
+
+Batch = Dict[str, np.ndarray]
+
+_scalar_only: "weakref.WeakSet[Callable]" = weakref.WeakSet()
+
+def stack_states(states: List[State]) -> Batch:
+    names = sorted({name for state in states for name in state})
+    return {name: np.array([state[name] for state in states], dtype=np.int64) for name in names}
+
+def lane(batch: Batch, i: int) -> State:
+    return {name: values[i].item() for name, values in batch.items()}
+
+class _Run:
+    def __init__(self, batch: Batch, lanes: int, fuel: Optional[int]) -> None:
+        self.batch = batch
+        self.lanes = lanes
+        self.fuel = fuel
+        self.iterations = np.zeros(lanes, dtype=np.int64)
+        self.diverged = np.zeros(lanes, dtype=bool)
+
+    def lift(self, f: Callable[[State], int], mask: np.ndarray) -> np.ndarray:
+        kernel = kernel_for(f)
+        # a kernel reads every variable of every path, and the batch may
+        # lack one that `f` only reads on paths no lane takes
+        missing = kernel is not None and not kernel.names <= self.batch.keys()
+        if kernel is not None and not missing:
+            return np.broadcast_to(kernel(self.batch), (self.lanes,))
+        if kernel is None and f not in _scalar_only:
+            try:
+                with np.errstate(all="ignore"):
+                    out = np.asarray(f(self.batch))
+                if out.shape == ():
+                    return np.full(self.lanes, out)
+                if out.shape == (self.lanes,):
+                    return out
+            except (ValueError, TypeError):
+                pass
+            _scalar_only.add(f)
+
+        # lane by lane, and only on the lanes that are running
+        out = None
+        for i in np.flatnonzero(mask):
+            value = f(lane(self.batch, i))
+            if out is None:
+                out = np.zeros(self.lanes, dtype=bool if isinstance(value, bool) else np.int64)
+            out[i] = value
+        return out if out is not None else np.zeros(self.lanes, dtype=bool)
+
+    def run(self, stmt: Stmt, mask: np.ndarray) -> None:
+        if not mask.any():
+            return
+        stmt.match(
+            skip=lambda: None,
+            assign=lambda x, a: self.assign(x, a, mask),
+            seq=lambda s1, s2: self.seq(s1, s2, mask),
+            if_then_else=lambda b, s1, s2: self.if_then_else(b, s1, s2, mask),
+            while_do=lambda b, s: self.while_do(stmt, b, s, mask),
+        )
+
+    def assign(self, x: str, a: Callable[[State], int], mask: np.ndarray) -> None:
+        old = self.batch.get(x)
+        if old is None:
+            old = np.zeros(self.lanes, dtype=np.int64)
+        self.batch[x] = np.where(mask, self.lift(a, mask), old)
+
+    def seq(self, s1: Stmt, s2: Stmt, mask: np.ndarray) -> None:
+        self.run(s1, mask)
+        # lanes that ran out of fuel in s1 stop there
+        self.run(s2, mask & ~self.diverged)
+
+    def if_then_else(self, b: Callable[[State], bool], s1: Stmt, s2: Stmt, mask: np.ndarray) -> None:
+        cond = self.lift(b, mask).astype(bool)
+        self.run(s1, mask & cond)
+        self.run(s2, mask & ~cond)
+
+    def at_loop_head(self, loop: Stmt, lanes: np.ndarray) -> None:
+        # called with the lanes about to test the condition of `loop`
+        pass
+
+    def while_do(self, loop: Stmt, b: Callable[[State], bool], s: Stmt, mask: np.ndarray) -> None:
+        self.at_loop_head(loop, mask)
+        active = mask & self.lift(b, mask).astype(bool)
+        while active.any():
+            if self.fuel is not None:
+                out_of_fuel = active & (self.iterations >= self.fuel)
+                self.diverged |= out_of_fuel
+                active &= ~out_of_fuel
+            self.iterations[active] += 1
+            self.run(s, active)
+            active &= ~self.diverged
+            self.at_loop_head(loop, active)
+            active &= self.lift(b, active).astype(bool)
+
+def evaluate_batch(stmt: Stmt, states: Batch, fuel: Optional[int] = None, lanes: Optional[int] = None) -> Tuple[Batch, np.ndarray]:
+    """
+    Runs `stmt` on every lane of `states` and returns the final states
+    together with a boolean mask of the lanes that diverged. `fuel` caps
+    the number of loop iterations per lane; a lane that hits it stops where
+    it is. `lanes` is only needed when `states` has no variables.
+    """
+    batch = {name: np.array(values, dtype=np.int64) for name, values in states.items()}
+    if lanes is None:
+        lanes = len(next(iter(batch.values())))
+    run = _Run(batch, lanes, fuel)
+    run.run(stmt, np.ones(lanes, dtype=bool))
+    return run.batch, run.diverged
@@ -0,0 +1,549 @@
+#!/usr/bin/env python3
+
+import argparse
+import inspect
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from batch import evaluate_batch
+from corpus import load_test
+from domain import configure_domain, domain_for
+from compiler import compile_stmt
+from hoare import Condition, State, Stmt, enumerate_backend, evaluate, evaluate_iterative, subst
+from slots import SlotState, evaluate_slots, layout_for
+
+# Benchmarks
+# ==========
+# Run with `python bench.py` from this directory; see "Tracked suite"
+# below for the JSON suite and baseline comparison.
+
+# `evaluate` recurses a few frames per loop iteration
+sys.setrecursionlimit(100000)
+
+def timeit(f: Callable[[], object], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def workloads(size: int) -> List[Tuple[str, Stmt, State]]:
+    # (name, program, initial state); each loop runs `size` iterations
+    return [
+        ("ADD", load_test("ADD").program, {"n": size, "m": 7}),
+        ("MUL", load_test("MUL").program, {"n": size, "m": 7}),
+        ("GAUSS", load_test("GAUSS", N=size).program, {}),
+        ("COUNT_UP", load_test("COUNT_UP").program, {"x": size, "y": 0}),
+    ]
+
+def bench_compile(sizes: Tuple[int, ...] = (100, 1000, 5000)) -> List[Dict[str, object]]:
+    rows = []
+    for size in sizes:
+        for name, program, state in workloads(size):
+            run = compile_stmt(program)
+            assert run(state) == evaluate(program, state)
+            t_eval = timeit(lambda: evaluate(program, state))
+            t_comp = timeit(lambda: run(state))
+            rows.append({
+                "program": name, "size": size,
+                "evaluate_s": t_eval, "compiled_s": t_comp,
+                "speedup": t_eval / t_comp,
+            })
+    return rows
+
+def bench_iterative(sizes: Tuple[int, ...] = (10000, 100000)) -> List[Dict[str, object]]:
+    # sizes past what the recursive `evaluate` can reach
+    rows = []
+    for size in sizes:
+        for name, program, state in workloads(size):
+            rows.append({
+                "program": name, "size": size,
+                "iterative_s": timeit(lambda: evaluate_iterative(program, state), repeat=1),
+            })
+    return rows
+
+def bench_slots(sizes: Tuple[int, ...] = (1000, 100000), widths: Tuple[int, ...] = (0, 64)) -> List[Dict[str, object]]:
+    # `width` extra variables that the program carries around untouched
+    rows = []
+    for size in sizes:
+        for width in widths:
+            for name, program, state in workloads(size):
+                state = {**state, **{f"v{i}": i for i in range(width)}}
+                run = compile_stmt(program)
+                assert evaluate_slots(program, state) == run(state)
+                rows.append({
+                    "program": name, "size": size, "width": width,
+                    "dict_s": timeit(lambda: run(state)),
+                    "slots_s": timeit(lambda: evaluate_slots(program, state)),
+                })
+    return rows
+
+def bench_accelerate(sizes: Tuple[int, ...] = (1000, 100000)) -> List[Dict[str, object]]:
+    from accelerate import accelerate
+
+    rows = []
+    for size in sizes:
+        for name, program, state in workloads(size):
+            run, fast = compile_stmt(program), accelerate(program)
+            assert fast(state) == run(state)
+            rows.append({
+                "program": name, "size": size,
+                "compiled_s": timeit(lambda: run(state), repeat=1),
+                "accelerated_s": timeit(lambda: fast(state)),
+            })
+    return rows
+
+def bench_memoized(size: int = 200) -> List[Dict[str, object]]:
+    # dense input grids; COUNT_UP runs from one input pass through
+    # others, MUL runs from different inputs never meet
+    from memoized import Memoized
+
+    grids = [
+        ("COUNT_UP", [{"x": x, "y": y} for x in range(size) for y in range(x + 1)]),
+        ("MUL", [{"n": n, "m": m} for n in range(size) for m in range(size // 10)]),
+    ]
+    rows = []
+    for name, states in grids:
+        program = load_test(name).program
+        run, memo = compile_stmt(program), Memoized(program)
+        compiled_s = timeit(lambda: [run(s) for s in states], repeat=1)
+        memoized_s = timeit(lambda: [memo(s) for s in states], repeat=1)
+        assert [run(s) for s in states] == [memo(s) for s in states]
+        rows.append({
+            "program": name, "inputs": len(states),
+            "compiled_s": compiled_s, "memoized_s": memoized_s,
+            "hit_rate": memo.stats()[0]["hit_rate"],
+        })
+    return rows
+
+def bench_batch(lanes: Tuple[int, ...] = (1000, 10000)) -> List[Dict[str, object]]:
+    # MUL over n in [0, 100), m in [0, lanes / 100)
+    program = load_test("MUL").program
+    run = compile_stmt(program)
+    rows = []
+    for count in lanes:
+        n = np.arange(count) % 100
+        m = np.arange(count) // 100
+        states = [{"n": int(a), "m": int(b)} for a, b in zip(n, m)]
+        rows.append({
+            "lanes": count,
+            "loop_s": timeit(lambda: [run(s) for s in states], repeat=1),
+            "batch_s": timeit(lambda: evaluate_batch(program, {"n": n, "m": m}), repeat=1),
+        })
+    return rows
+
+def loop_side_conditions() -> List[Tuple[str, Condition, Condition]]:
+    # (name, I ∧ B, wp(body, I)) for the MUL and GAUSS loops
+    a, b, N = 7, 5, 20
+    mul_I = lambda s: s["r"] + s["n"] * s["m"] == a * b and s["m"] == b
+    mul_B = lambda s: s["n"] != 0
+    mul_wp = subst(subst(mul_I, lambda s: s["n"] - 1, "n"), lambda s: s["r"] + s["m"], "r")
+
+    # GAUSS with `r == sumUpTo(n)` can't be traced, so also time the
+    # closed form of the invariant
+    sumUpTo = load_test("GAUSS", N=N).namespace["sumUpTo"]
+    gauss_B = lambda s: s["n"] != N
+    gauss = []
+    for name, I in [
+        ("GAUSS", lambda s: s["r"] == sumUpTo(s["n"]) if s["n"] >= 0 else False),
+        ("GAUSS closed form", lambda s: 2 * s["r"] == s["n"] * (s["n"] + 1)),
+    ]:
+        wp = subst(subst(I, lambda s: s["r"] + s["n"], "r"), lambda s: s["n"] + 1, "n")
+        gauss.append((name, lambda s, I=I: I(s) and gauss_B(s), wp))
+
+    return [("MUL", lambda s: mul_I(s) and mul_B(s), mul_wp)] + gauss
+
+def bench_smt(ranges: Tuple[int, ...] = (10, 20, 40, 80)) -> List[Dict[str, object]]:
+    from smt import smt_backend
+
+    rows = []
+    for name, pre, post in loop_side_conditions():
+        for k in ranges:
+            configure_domain(range(-k, k))
+            domain = domain_for(pre, post)
+            assert enumerate_backend("implies", pre, post, domain)
+            rows.append({
+                "check": name, "range": 2 * k, "states": len(domain),
+                "grid_s": timeit(lambda: enumerate_backend("implies", pre, post, domain), repeat=1),
+                "smt_s": timeit(lambda: smt_backend("implies", pre, post, domain), repeat=1),
+            })
+    configure_domain(range(10))
+    return rows
+
+def nested_subst(P: Condition, a: Callable[[State], int], x: str) -> Condition:
+    # `subst` as it was before conditions.Subst
+    return lambda s: P({**s, x: a(s)})
+
+def bench_subst(depths: Tuple[int, ...] = (1, 4, 16)) -> List[Dict[str, object]]:
+    # preconditions of the MUL and GAUSS loop bodies unrolled `depth`
+    # times, i.e. 2 * depth substitutions of the invariant, evaluated on
+    # every state of their domain
+    a, b, N = 7, 5, 20
+    bodies = [
+        ("MUL", lambda s: s["r"] + s["n"] * s["m"] == a * b and s["m"] == b,
+         [("r", lambda s: s["r"] + s["m"]), ("n", lambda s: s["n"] - 1)]),
+        ("GAUSS", lambda s: 2 * s["r"] == s["n"] * (s["n"] + 1),
+         [("n", lambda s: s["n"] + 1), ("r", lambda s: s["r"] + s["n"])]),
+    ]
+    rows = []
+    for name, I, body in bodies:
+        for depth in depths:
+            flat, nested = I, I
+            for _ in range(depth):
+                # assign_intro works backwards through the body
+                for x, e in reversed(body):
+                    flat = subst(flat, e, x)
+                    nested = nested_subst(nested, e, x)
+            states = domain_for(flat).states
+            assert [flat(s) for s in states] == [nested(s) for s in states]
+            rows.append({
+                "proof": name, "substs": 2 * depth, "states": len(states),
+                "nested_s": timeit(lambda: [nested(s) for s in states]),
+                "flat_s": timeit(lambda: [flat(s) for s in states]),
+            })
+    return rows
+
+def bench_vcgen(params: int = 10) -> List[Dict[str, object]]:
+    # MUL and ADD with their invariants, for every (a, b) in a
+    # params x params grid
+    from vcgen import loops, verify_program
+
+    annotated = {
+        "MUL": (lambda s, a, b: s["n"] == a and s["m"] == b,
+                lambda s, a, b: s["r"] == a * b,
+                lambda s, a, b: s["r"] + s["n"] * s["m"] == a * b and s["m"] == b),
+        "ADD": (lambda s, a, b: s["n"] == a and s["m"] == b,
+                lambda s, a, b: s["n"] == 0 and s["m"] == a + b,
+                lambda s, a, b: s["n"] + s["m"] == a + b),
+    }
+    rows = []
+    for name, (P, Q, I) in annotated.items():
+        program = load_test(name).program
+        start = time.perf_counter()
+        for a in range(params):
+            for b in range(params):
+                bind = lambda f, a=a, b=b: lambda s: f(s, a, b)
+                assert verify_program(program, bind(P), bind(Q), {loop: bind(I) for loop in loops(program)})
+        elapsed = time.perf_counter() - start
+        rows.append({"program": name, "proofs": params * params, "total_s": elapsed,
+                     "proofs_per_min": params * params * 60 / elapsed})
+    return rows
+
+def bench_sweep(params: int = 100, looped: int = 10) -> List[Dict[str, object]]:
+    # every (a, b) in a params x params grid; the per-point loop only
+    # runs the first `looped` values of a, and is scaled up
+    from hoare import add_proof, swap_proof
+    from sweep import sweep, sweep_loop
+
+    rows = []
+    for proof in (add_proof, swap_proof):
+        start = time.perf_counter()
+        swept = sweep(proof, a=range(params), b=range(params))
+        sweep_s = time.perf_counter() - start
+        start = time.perf_counter()
+        loop = sweep_loop(proof, a=range(looped), b=range(params))
+        loop_s = (time.perf_counter() - start) * params / looped
+        assert (swept.ok[:looped * params] == loop.ok).all()
+        rows.append({
+            "proof": proof.__name__, "points": params * params,
+            "loop_s": loop_s, "sweep_s": sweep_s,
+            "loop_per_s": params * params / loop_s, "sweep_per_s": params * params / sweep_s,
+        })
+    return rows
+
+def bench_validate(size: int = 100) -> List[Dict[str, object]]:
+    # MUL from every n, m < size: a right spec runs every state, a wrong
+    # one stops at its first counterexample
+    from validate import ENGINES, validate
+
+    program = load_test("MUL").program
+    P = lambda s: True
+    specs = [("right", lambda s: s["r"] >= 0), ("wrong", lambda s: s["r"] < size * size // 2)]
+    configure_domain(range(size))
+    rows = []
+    for spec, Q in specs:
+        for engine in ENGINES:
+            start = time.perf_counter()
+            result = validate(program, P, Q, engine=engine)
+            rows.append({"spec": spec, "engine": engine, "runs": result.checked,
+                         "valid": bool(result), "total_s": time.perf_counter() - start})
+    configure_domain(range(10))
+    return rows
+
+def bench_imp(count: int = 1000) -> List[Dict[str, object]]:
+    # loading the corpus programs `count` times each: exec of the .test
+    # fragment, IMP text, JSON and binary (all with fresh ASTs, so the
+    # lambda cache is the only thing shared)
+    import imp_syntax
+    from imp_syntax import dumps_ast, imp_names, load_imp, loads_ast, parse_ast, to_ast
+
+    rows = []
+    for name in imp_names():
+        with open(os.path.join(imp_syntax.PROGRAM_DIR, name + ".imp")) as f:
+            text = f.read()
+        ast = parse_ast(text)
+        as_json, as_binary = json.dumps(ast), dumps_ast(ast)
+        assert to_ast(load_imp(name, N=3)) == to_ast(load_test(name, N=3).program)
+        rows.append({
+            "program": name, "text_bytes": len(text), "json_bytes": len(as_json), "binary_bytes": len(as_binary),
+            "exec_us": timeit(lambda: [load_test(name, N=3) for _ in range(count)], repeat=1) / count * 1e6,
+            "parse_us": timeit(lambda: [parse_ast(text) for _ in range(count)]) / count * 1e6,
+            "json_us": timeit(lambda: [json.loads(as_json) for _ in range(count)]) / count * 1e6,
+            "binary_us": timeit(lambda: [loads_ast(as_binary) for _ in range(count)]) / count * 1e6,
+            "load_imp_us": timeit(lambda: [load_imp(name, N=3) for _ in range(count)]) / count * 1e6,
+        })
+    return rows
+
+def allocated(build: Callable[[], object]) -> int:
+    tracemalloc.start()
+    kept = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+def bench_state_memory(count: int = 10000) -> List[Dict[str, object]]:
+    # bytes per live state for the MUL variables (n, m, r)
+    state = {"n": 12345, "m": 678, "r": 9012345}
+    layout = layout_for(load_test("MUL").program, state)
+    dicts = allocated(lambda: [dict(state) for _ in range(count)])
+    arrays = allocated(lambda: [layout.pack(state) for _ in range(count)])
+    views = allocated(lambda: [SlotState(layout, layout.pack(state), bytearray(len(layout.names) - layout.fresh)) for _ in range(count)])
+    return [
+        {"backend": "dict", "bytes_per_state": dicts / count},
+        {"backend": "array", "bytes_per_state": arrays / count},
+        {"backend": "array+view", "bytes_per_state": views / count},
+    ]
+
+def print_rows(title: str, rows: List[Dict[str, object]]) -> None:
+    print(title)
+    print("=" * len(title))
+    for row in rows:
+        print("  ".join(
+            f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}"
+            for k, v in row.items()
+        ))
+    print()
+
+# Tracked suite
+# =============
+# A fixed set of measurements, written as JSON and compared against
+# the baseline in bench_baseline.json to catch regressions:
+#
+#     python bench.py suite -o results.json
+#     python bench.py compare results.json     # exits 1 on a regression
+#     python bench.py suite -o bench_baseline.json   # new baseline
+#
+# Metrics are named "area/what/size". Times are per call, in units of
+# `calibration_loop`, which `measure` times alongside every round, so a
+# baseline taken on a faster or slower host, or at a busier moment of the
+# same one, still compares. Memory is bytes per live state. The seconds
+# one calibration loop took are kept as "calibration", for reference.
+#
+# Normalizing evens out uniform speed differences, not the relative cost
+# of operations, which changes with the Python version and the hardware:
+# after either changes, take a new baseline. On small shared machines
+# short-lived load still moves single metrics by a third or more; use
+# several passes there, or a larger --threshold.
+#
+# Proofs are timed with their side conditions deferred (obligations.py),
+# so a failing proof still checks every one of them and is timed doing
+# the same work as a passing one. Whether each proof passes is kept
+# apart under "proofs", and a proof that passed in the baseline and no
+# longer does is a regression.
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+def calibration_loop(steps: int = 20000) -> None:
+    # the kind of work the suite does: interpreted arithmetic and dict copies
+    state = {"i": 0, "r": 0}
+    while state["i"] < steps:
+        state = {**state, "r": state["r"] + state["i"], "i": state["i"] + 1}
+
+def _per_call(f: Callable[[], object], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        f()
+    return (time.perf_counter() - start) / number
+
+def _calls_for(f: Callable[[], object], min_time: float) -> int:
+    number = 1
+    while _per_call(f, number) * number < min_time:
+        number *= 2
+    return number
+
+def measure(f: Callable[[], object], repeat: int = 5, min_time: float = 0.05) -> float:
+    """
+    Time per call of `f` in calibration loops: the best of `repeat`
+    rounds of at least `min_time` seconds each, where every round also
+    times `calibration_loop`, so both see the same load.
+    """
+    number = _calls_for(f, min_time)
+    loops = _calls_for(calibration_loop, min_time / 2)
+    return min(_per_call(f, number) / _per_call(calibration_loop, loops) for _ in range(repeat))
+
+def suite_evaluate(sizes: Tuple[int, ...] = (10, 100, 1000)) -> Dict[str, float]:
+    return {
+        f"evaluate/{name}/{size}": measure(lambda: evaluate(program, state))
+        for size in sizes for name, program, state in workloads(size)
+    }
+
+def suite_entailment(ranges: Tuple[int, ...] = (10, 20, 40), counts: Tuple[int, ...] = (1, 2, 3)) -> Dict[str, float]:
+    # checks that hold, so every state is visited; the check cache is
+    # cleared so each run does the work
+    from hoare import CHECK_CACHE, check_equal, check_implies
+
+    out = {}
+    for count in counts:
+        names = [f"v{i}" for i in range(count)]
+        total = lambda s: sum(s[v] for v in names)
+        at_least = lambda s: total(s) >= count
+        not_below = lambda s: not total(s) < count
+        above = lambda s: total(s) > count
+        for k in ranges:
+            configure_domain(range(k))
+            for kind, check, P1, P2 in [("equal", check_equal, at_least, not_below),
+                                         ("implies", check_implies, above, at_least)]:
+                def run() -> None:
+                    CHECK_CACHE.clear()
+                    assert check(P1, P2)
+                out[f"entailment/{kind}/{count}vars/{k}"] = measure(run)
+    configure_domain(range(10))
+    return out
+
+def _proof_tasks(value: int) -> List[Tuple[str, Tuple[str, Dict[str, int], float]]]:
+    # every results/*_proof with all its parameters set to `value`
+    from corpus import program_names
+    from run_proofs import parameters, proof_path
+
+    return [(f"proofs/{name}/{value}", (name, {p: value for p in parameters(name)}, 60.0))
+            for name in program_names() if os.path.exists(proof_path(name))]
+
+def proof_status(value: int = 2) -> Dict[str, str]:
+    """pass, fail, timeout or error per proof, as `run_proofs` reports it."""
+    from run_proofs import run_task
+
+    return {metric: run_task(task)["status"] for metric, task in _proof_tasks(value)}
+
+def suite_proofs(value: int = 2) -> Dict[str, float]:
+    # the proof and every side condition it records, checked to the end
+    # whether or not they hold; the tables are cleared so each run does
+    # the work
+    from obligations import check_proof
+    from run_proofs import proof_code, proof_function, proof_path
+    from truth_table import TABLES
+
+    out = {}
+    for metric, (name, params, _) in _proof_tasks(value):
+        namespace = load_test(name, **params).namespace
+        exec(proof_code(proof_path(name)), namespace)
+        proof = proof_function(namespace, proof_path(name))
+        args = [params[p] for p in inspect.signature(proof).parameters]
+
+        def run() -> None:
+            TABLES.clear()
+            check_proof(proof, *args)
+        out[metric] = measure(run, repeat=3)
+    return out
+
+def suite_memory(count: int = 10000) -> Dict[str, float]:
+    return {f"memory/{row['backend']}": row["bytes_per_state"] for row in bench_state_memory(count)}
+
+SUITE = [suite_evaluate, suite_entailment, suite_proofs, suite_memory]
+
+def run_suite(passes: int = 3) -> Dict[str, object]:
+    # timing noise only ever adds time, so keep each metric's best pass
+    metrics: Dict[str, float] = {}
+    calibration = float("inf")
+    for _ in range(passes):
+        calibration = min(calibration, _per_call(calibration_loop, _calls_for(calibration_loop, 0.05)))
+        for area in SUITE:
+            for name, value in area().items():
+                metrics[name] = min(value, metrics.get(name, value))
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "calibration": calibration,
+        "proofs": proof_status(),
+        "metrics": metrics,
+    }
+
+def compare(results: Dict[str, object], baseline: Dict[str, object],
+            threshold: float = 0.25, floor: float = 1e-4) -> List[Dict[str, object]]:
+    """
+    One row per metric, and one per proof that does not pass. A metric
+    regresses when it grew by more than `threshold` (a fraction), and
+    for times by more than `floor` seconds (at the baseline's calibration),
+    so microsecond noise does not count.
+    """
+    new, old = results["metrics"], baseline["metrics"]
+    floor /= baseline["calibration"]
+    rows: List[Dict[str, object]] = []
+    for name in sorted(set(new) | set(old)):
+        if name not in old or name not in new:
+            rows.append({"metric": name, "status": "new" if name in new else "missing"})
+            continue
+        ratio = new[name] / old[name] if old[name] else float("inf")
+        noise = not name.startswith("memory/") and new[name] - old[name] <= floor
+        status = "regressed" if ratio > 1 + threshold and not noise else (
+            "improved" if ratio < 1 / (1 + threshold) else "same")
+        rows.append({"metric": name, "status": status, "baseline": old[name], "new": new[name], "ratio": ratio})
+    for name, status in sorted(results["proofs"].items()):
+        if status != "pass":
+            was = baseline["proofs"].get(name)
+            rows.append({"metric": name, "status": "regressed" if was == "pass" else status})
+    return rows
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks; without a command, prints every table.")
+    commands = parser.add_subparsers(dest="command")
+    suite = commands.add_parser("suite", help="run the tracked suite and write it as JSON")
+    suite.add_argument("-o", "--out", default="bench_results.json")
+    suite.add_argument("--passes", type=int, default=3, help="runs of the whole suite, best one kept")
+    compare_cmd = commands.add_parser("compare", help="flag regressions against the baseline")
+    compare_cmd.add_argument("results")
+    compare_cmd.add_argument("--baseline", default=BASELINE)
+    compare_cmd.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, as a fraction")
+    args = parser.parse_args(argv)
+
+    if args.command == "suite":
+        with open(args.out, "w") as f:
+            json.dump(run_suite(args.passes), f, indent=2)
+        return 0
+    if args.command == "compare":
+        with open(args.results) as f:
+            results = json.load(f)
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if (results["python"], results["machine"]) != (baseline["python"], baseline["machine"]):
+            print(f"note: baseline is from Python {baseline['python']} on {baseline['machine']}\n")
+        rows = compare(results, baseline, args.threshold)
+        print_rows(f"{args.results} vs {args.baseline}", rows)
+        return 1 if any(row["status"] == "regressed" for row in rows) else 0
+
+    print_rows("compile_stmt vs evaluate", bench_compile())
+    print_rows("evaluate_iterative", bench_iterative())
+    print_rows("evaluate_slots vs compile_stmt", bench_slots())
+    print_rows("accelerate vs compile_stmt", bench_accelerate())
+    print_rows("memoized vs compiled sweeps", bench_memoized())
+    print_rows("memory per state", bench_state_memory())
+    print_rows("evaluate_batch vs compiled loop", bench_batch())
+    print_rows("smt_backend vs grid enumeration", bench_smt())
+    print_rows("flattened vs nested subst", bench_subst())
+    print_rows("vcgen + discharge", bench_vcgen())
+    print_rows("parameter sweep vs per-point loop", bench_sweep())
+    print_rows("triple validation", bench_validate())
+    print_rows("IMP syntax: loading programs", bench_imp())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
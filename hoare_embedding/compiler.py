@@ -0,0 +1,96 @@
+import weakref
+from typing import Callable, List, Optional
+
+from hoare import State, Stmt
+
+# Closure compiler
+# ================
+# `evaluate` re-dispatches through `stmt.match(...)` on every step, which
+# rebuilds the five case lambdas for every node it visits. Here we walk the
+# `Stmt` tree once and return a single closure that runs the program
+# directly. The semantics are those of `evaluate`: every assignment
+# produces a fresh state, so callers may keep references to old ones.
+
+Compiled = Callable[[State], State]
+
+_compiled: "weakref.WeakKeyDictionary[Stmt, Compiled]" = weakref.WeakKeyDictionary()
+
+def compile_stmt(stmt: Stmt) -> Compiled:
+    """
+    Compiles `stmt` into a closure with the same big-step semantics as
+    `evaluate(stmt, ·)`. The result is cached per program object.
+    """
+    run = _compiled.get(stmt)
+    if run is None:
+        run = _compile(stmt)
+        _compiled[stmt] = run
+    return run
+
+def _compile(stmt: Stmt, compile_while: Optional[Callable[..., Compiled]] = None) -> Compiled:
+    # `compile_while(b, s, compile_while)` compiles loops; accelerate.py
+    # passes its own
+    if compile_while is None:
+        compile_while = _compile_while
+    return stmt.match(
+        skip=lambda: _skip,
+        assign=_compile_assign,
+        seq=lambda s1, s2: _compile_seq(stmt, compile_while),
+        if_then_else=lambda b, s1, s2: _compile_if(b, s1, s2, compile_while),
+        while_do=lambda b, s: compile_while(b, s, compile_while),
+    )
+
+def _skip(state: State) -> State:
+    return state
+
+def _compile_assign(x: str, a: Callable[[State], int]) -> Compiled:
+    def run(state: State) -> State:
+        new_state = state.copy()
+        new_state[x] = a(state)
+        return new_state
+    return run
+
+def _flatten_seq(stmt: Stmt, out: List[Stmt]) -> None:
+    # SEQ(SEQ(a, b), c) and SEQ(a, SEQ(b, c)) both become [a, b, c]
+    parts = stmt.match(
+        skip=lambda: None,
+        assign=lambda x, a: None,
+        seq=lambda s1, s2: (s1, s2),
+        if_then_else=lambda b, s1, s2: None,
+        while_do=lambda b, s: None,
+    )
+    if parts is None:
+        out.append(stmt)
+    else:
+        _flatten_seq(parts[0], out)
+        _flatten_seq(parts[1], out)
+
+def _compile_seq(stmt: Stmt, compile_while: Callable[..., Compiled]) -> Compiled:
+    stmts: List[Stmt] = []
+    _flatten_seq(stmt, stmts)
+    steps = [_compile(s, compile_while) for s in stmts]
+
+    if len(steps) == 2:
+        first, second = steps
+        return lambda state: second(first(state))
+
+    def run(state: State) -> State:
+        for step in steps:
+            state = step(state)
+        return state
+    return run
+
+def _compile_if(b: Callable[[State], bool], s1: Stmt, s2: Stmt,
+                compile_while: Callable[..., Compiled]) -> Compiled:
+    then_branch = _compile(s1, compile_while)
+    else_branch = _compile(s2, compile_while)
+    return lambda state: then_branch(state) if b(state) else else_branch(state)
+
+def _compile_while(b: Callable[[State], bool], s: Stmt,
+                   compile_while: Callable[..., Compiled]) -> Compiled:
+    body = _compile(s, compile_while)
+
+    def run(state: State) -> State:
+        while b(state):
+            state = body(state)
+        return state
+    return run
@@ -0,0 +1,82 @@
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from memo import condition_key
+
+# Condition combinators
+# =====================
+# The rules used to build `lambda s: P(s) and B(s)` and substitutions on
+# the spot. These callables compute the same thing but keep their parts
+# around, so checkers can work on the structure (e.g. AND two truth
+# tables instead of re-running both sides, or tell which variables a
+# substituted condition really reads) and cache by it.
+
+State = Dict[str, int]
+Condition = Callable[[State], bool]
+
+class Conj:
+    """P ∧ Q"""
+    __slots__ = ("P", "Q", "__weakref__")
+
+    def __init__(self, P: Condition, Q: Condition) -> None:
+        self.P = P
+        self.Q = Q
+
+    def __call__(self, s: State) -> Any:
+        return self.P(s) and self.Q(s)
+
+    @property
+    def key(self) -> Hashable:
+        return ("and", condition_key(self.P), condition_key(self.Q))
+
+    def __repr__(self) -> str:
+        return f"Conj({self.P!r}, {self.Q!r})"
+
+class Neg:
+    """¬P"""
+    __slots__ = ("P", "__weakref__")
+
+    def __init__(self, P: Condition) -> None:
+        self.P = P
+
+    def __call__(self, s: State) -> bool:
+        return not self.P(s)
+
+    @property
+    def key(self) -> Hashable:
+        return ("not", condition_key(self.P))
+
+    def __repr__(self) -> str:
+        return f"Neg({self.P!r})"
+
+class Subst:
+    """
+    P[a1/x1]...[an/xn]. A substitution of a substitution is flattened
+    into one list of updates, applied in order to a single copy of the
+    state: `x2 := a2` sees the state after `x1 := a1`, just like the
+    assignments that produced them.
+    """
+    __slots__ = ("P", "updates", "__weakref__")
+
+    def __init__(self, P: Condition, a: Callable[[State], int], x: str) -> None:
+        if isinstance(P, Subst):
+            # P'[...][a/x] = P'[a/x][...]: the outer update comes first
+            self.P = P.P
+            self.updates: Tuple[Tuple[str, Callable[[State], int]], ...] = ((x, a),) + P.updates
+        else:
+            self.P = P
+            self.updates = ((x, a),)
+
+    def __call__(self, s: State) -> Any:
+        s = dict(s)
+        for x, a in self.updates:
+            s[x] = a(s)
+        return self.P(s)
+
+    @property
+    def key(self) -> Hashable:
+        return ("subst", condition_key(self.P),
+                tuple((x, condition_key(a)) for x, a in self.updates))
+
+    def __repr__(self) -> str:
+        updates = ", ".join(f"{x} := {a!r}" for x, a in self.updates)
+        return f"Subst({self.P!r}, [{updates}])"
@@ -0,0 +1,55 @@
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+import hoare
+from hoare import Condition, Stmt
+
+# Program corpus
+# ==============
+# The programs in `programs/*.test` are Python fragments that `test-gen.py`
+# pastes into `hoare_template.py`. We load them the same way here: each
+# fragment is executed against the definitions in `hoare.py`, with the
+# proof parameters (e.g. `a`, `b`, or the free `N` in GAUSS) bound in
+# the same namespace.
+
+PROGRAM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "programs")
+
+@dataclass
+class TestCase:
+    name: str
+    program: Stmt
+    triple: str
+    inputs: Tuple[str, ...]
+    P: Condition
+    Q: Condition
+    namespace: Dict[str, Any] = field(repr=False)
+
+def program_names() -> List[str]:
+    return sorted(f[:-len(".test")] for f in os.listdir(PROGRAM_DIR) if f.endswith(".test"))
+
+def read_sections(name: str) -> Tuple[str, str, str, str]:
+    # Same layout as `read_test_case` in `test-gen.py`:
+    # program, triple, proof inputs, pre/postcondition
+    with open(os.path.join(PROGRAM_DIR, name + ".test"), "r") as f:
+        sections = f.read().split("\n\n")
+    return tuple(section.strip() for section in sections[:4])
+
+def load_test(name: str, **params: Any) -> TestCase:
+    program, triple, input_data, prepost = read_sections(name)
+
+    namespace = dict(vars(hoare))
+    namespace.update(params)
+    exec(program, namespace)
+    exec(prepost, namespace)
+
+    inputs = tuple(p.strip() for p in input_data.strip("()").split(",") if p.strip())
+    return TestCase(
+        name=name,
+        program=namespace[name],
+        triple=triple,
+        inputs=inputs,
+        P=namespace["P"],
+        Q=namespace["Q"],
+        namespace=namespace,
+    )
@@ -0,0 +1,150 @@
+import sys
+import weakref
+from typing import Any, Callable, Hashable, Iterator, List, Tuple
+
+import hoare
+from hoare import CheckResult, Condition, HoareTriple, State
+from memo import LRUCache, condition_key
+
+# Derivations
+# ===========
+# The rules in hoare.py check their side conditions and hand back a bare
+# triple, so the shape of the proof is lost. The rules here have the same
+# names and arguments but build a Derivation instead: the rule, its
+# arguments, its premises and its conclusion. A Derivation unpacks like
+# the triple it concludes, so a proof written against hoare.py runs
+# unchanged against this module.
+#
+# Nothing is checked while a derivation is built; `verify` walks it
+# afterwards. Derivations are interned by structure (see memo.py for how
+# conditions are keyed), so a sub-proof used twice is one node and is
+# checked once. Verified nodes are remembered in VERIFIED, so checking a
+# proof again after an edit only checks the nodes the edit changed.
+#
+# Conditions are keyed on the values of the globals they read, so a
+# step whose condition reads an edited global (say K = 1 to K = 5) is a
+# new node and is checked again:
+#
+#     import derivation
+#     namespace = {**vars(hoare), **vars(derivation)}
+#     exec(proof_source, namespace)
+#     derivation.verify(namespace["proof"](3, 4))
+#     # after an edit, only the changed steps are checked
+#     exec(edited_source, namespace)
+#     derivation.verify(namespace["proof"](3, 4))
+
+Obligation = Tuple[Callable[[Condition, Condition], CheckResult], Condition, Condition]
+
+class Derivation:
+    __slots__ = ("rule", "args", "premises", "conclusion", "obligations", "key", "where", "__weakref__")
+
+    def __init__(self, rule: str, args: Tuple[Any, ...], premises: Tuple["Derivation", ...],
+                 conclusion: HoareTriple, obligations: List[Obligation], key: Hashable,
+                 where: str) -> None:
+        self.rule = rule
+        self.args = args
+        self.premises = premises
+        self.conclusion = conclusion
+        # the side conditions of this step, see `hoare.require`
+        self.obligations = obligations
+        self.key = key
+        # file:line of the proof step that built it
+        self.where = where
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.conclusion)
+
+    def __getitem__(self, i: int) -> Any:
+        return self.conclusion[i]
+
+    def __len__(self) -> int:
+        return 3
+
+    def __repr__(self) -> str:
+        return f"Derivation({self.rule}, {len(self.premises)} premises)"
+
+_interned: "weakref.WeakValueDictionary[Hashable, Derivation]" = weakref.WeakValueDictionary()
+
+# keys of the nodes whose side conditions hold
+VERIFIED = LRUCache(maxsize=4096)
+
+def _arg_key(arg: Any) -> Hashable:
+    if isinstance(arg, Derivation):
+        return arg.key
+    if isinstance(arg, str):
+        return arg
+    return condition_key(arg)
+
+def derive(rule: Callable[..., HoareTriple], *args: Any) -> Derivation:
+    """
+    The derivation of `rule(*args)`, where the triples among `args` may
+    be derivations. Its side conditions are recorded, not checked.
+    """
+    key = (rule.__name__,) + tuple(_arg_key(arg) for arg in args)
+    node = _interned.get(key)
+    if node is not None:
+        return node
+
+    obligations: List[Obligation] = []
+    outer = hoare.DEFER
+    hoare.DEFER = lambda check, P1, P2: obligations.append((check, P1, P2))
+    try:
+        conclusion = rule(*(arg.conclusion if isinstance(arg, Derivation) else arg for arg in args))
+    finally:
+        hoare.DEFER = outer
+
+    premises = tuple(arg for arg in args if isinstance(arg, Derivation))
+    # called from one of the rules below, which is called from the proof
+    step = sys._getframe(2)
+    where = f"{step.f_code.co_filename}:{step.f_lineno}"
+    node = Derivation(rule.__name__, args, premises, conclusion, obligations, key, where)
+    _interned[key] = node
+    return node
+
+def verify(root: Derivation) -> int:
+    """
+    Checks every side condition in `root`, premises first, and returns
+    how many nodes had to be checked. Fails on the first side condition
+    that does not hold, naming the rule and the proof step.
+    """
+    checked = 0
+    seen = set()
+    stack = [(root, False)]
+    while stack:
+        node, premises_done = stack.pop()
+        if not premises_done:
+            if id(node) in seen or VERIFIED.get(node.key) is not None:
+                continue
+            seen.add(id(node))
+            stack.append((node, True))
+            stack.extend((premise, False) for premise in reversed(node.premises))
+            continue
+        for check, P1, P2 in node.obligations:
+            result = check(P1, P2)
+            assert result, f"{node.rule} at {node.where}: {check.__name__} fails at {result.counterexample}"
+        checked += 1
+        # keep the node alive so identity-based parts of its key stay valid
+        VERIFIED.put(node.key, node)
+    return checked
+
+# Rules
+# =====
+# Same signatures as in hoare.py.
+
+def skip_intro(P: Condition) -> Derivation:
+    return derive(hoare.skip_intro, P)
+
+def assign_intro(x: str, a: Callable[[State], int], Q: Condition) -> Derivation:
+    return derive(hoare.assign_intro, x, a, Q)
+
+def seq_intro(HT1: HoareTriple, HT2: HoareTriple) -> Derivation:
+    return derive(hoare.seq_intro, HT1, HT2)
+
+def if_intro(P: Condition, B: Callable[[State], bool], HT1: HoareTriple, HT2: HoareTriple) -> Derivation:
+    return derive(hoare.if_intro, P, B, HT1, HT2)
+
+def while_intro(I: Condition, B: Callable[[State], bool], HT: HoareTriple) -> Derivation:
+    return derive(hoare.while_intro, I, B, HT)
+
+def consequence(Pp: Condition, HT: HoareTriple, Qp: Condition) -> Derivation:
+    return derive(hoare.consequence, Pp, HT, Qp)
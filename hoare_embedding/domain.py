@@ -0,0 +1,201 @@
+import itertools
+from collections.abc import Mapping
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+
+from conditions import Conj, Neg, Subst
+from memo import LRUCache, condition_key
+
+# State domains
+# =============
+# `check_equal` and `check_implies` quantify over "all states". We
+# approximate that by the product of a finite range per variable, over
+# exactly the variables the conditions read. Those are found by running
+# each condition against a recording mapping, or from the structure of
+# the combinators in conditions.py.
+
+State = Dict[str, int]
+Condition = Callable[[State], bool]
+
+DEFAULT_RANGE = range(10)
+
+# per-variable overrides of DEFAULT_RANGE, see `configure_domain`
+RANGES: Dict[str, range] = {}
+
+# how many states of the partial domain to probe a condition with
+MAX_PROBES = 1000
+
+class RecordingState(Mapping):
+    """
+    Mapping that records every variable read from it. Unknown variables
+    read as 0 and are added to the mapping, so copies made with
+    `{**s, ...}` (as in `subst`) carry them along.
+    """
+    __slots__ = ("values", "reads")
+
+    def __init__(self, values: State) -> None:
+        self.values = dict(values)
+        self.reads: Set[str] = set()
+
+    def __getitem__(self, name: str) -> int:
+        self.reads.add(name)
+        return self.values.setdefault(name, 0)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.values)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+# by structural key rather than by object: rules build fresh
+# `lambda s: I(s) and B(s)` conditions on every call, and a condition's
+# read set can change with the globals it reads (see memo.py)
+_reads_by_key = LRUCache(maxsize=4096)
+
+def reads(P: Condition) -> FrozenSet[str]:
+    """
+    The variables `P` reads. Conditions can short-circuit (`x == a and
+    y <= a` only reads y when x == a), so we keep probing `P` over the
+    domain of the variables found so far until no new ones show up.
+    """
+    key = condition_key(P)
+    entry = _reads_by_key.get(key)
+    if entry is not None:
+        return entry[0]
+
+    if isinstance(P, Conj):
+        found = reads(P.P) | reads(P.Q)
+    elif isinstance(P, Neg):
+        found = reads(P.P)
+    elif isinstance(P, Subst):
+        # P[a/x] reads what P reads, except that x is replaced by a;
+        # walk back from P through the updates. Every update is
+        # evaluated, so a counts even when P does not read x.
+        found = reads(P.P)
+        for x, a in reversed(P.updates):
+            found = (found - {x}) | reads(a)
+    else:
+        found = _probe(P)
+
+    # keep P alive so identity-based parts of its key stay valid
+    _reads_by_key.put(key, (found, P))
+    return found
+
+def _probe(P: Condition) -> FrozenSet[str]:
+    names: Set[str] = set()
+    while True:
+        before = len(names)
+        for state in itertools.islice(get_domain(tuple(sorted(names))).states, MAX_PROBES):
+            recorder = RecordingState(state)
+            try:
+                P(recorder)
+            except KeyError as e:
+                # a plain dict copied from the recorder before this
+                # variable was known
+                if e.args and isinstance(e.args[0], str):
+                    names.add(e.args[0])
+            except Exception:
+                pass
+            names |= recorder.reads
+            if len(names) != before:
+                break
+        if len(names) == before:
+            break
+    return frozenset(names)
+
+def range_for(name: str) -> range:
+    return RANGES.get(name, DEFAULT_RANGE)
+
+class Domain:
+    __slots__ = ("names", "ranges", "_states")
+
+    def __init__(self, names: Tuple[str, ...]) -> None:
+        self.names = names
+        self.ranges = tuple(range_for(name) for name in names)
+        self._states: Optional[List[State]] = None
+
+    @property
+    def states(self) -> List[State]:
+        # built on first use: a check split into independent parts never
+        # enumerates the whole domain
+        if self._states is None:
+            self._states = [
+                dict(zip(self.names, values)) for values in itertools.product(*self.ranges)
+            ]
+        return self._states
+
+    @property
+    def key(self) -> Tuple:
+        return tuple((name, r.start, r.stop, r.step) for name, r in zip(self.names, self.ranges))
+
+    def __len__(self) -> int:
+        size = 1
+        for r in self.ranges:
+            size *= len(r)
+        return size
+
+_domains: Dict[Tuple[str, ...], Domain] = {}
+
+def get_domain(names: Tuple[str, ...]) -> Domain:
+    # shared between all checks over the same variables
+    domain = _domains.get(names)
+    if domain is None:
+        domain = _domains[names] = Domain(names)
+    return domain
+
+def domain_for(*conditions: Condition) -> Domain:
+    names: Set[str] = set()
+    for P in conditions:
+        names |= reads(P)
+    return get_domain(tuple(sorted(names)))
+
+def configure_domain(default: Optional[range] = None, **ranges: range) -> None:
+    """
+    Sets the range each variable is enumerated over, e.g.
+    `configure_domain(range(-5, 20), n=range(0, 100))`.
+    """
+    global DEFAULT_RANGE
+    if default is not None:
+        DEFAULT_RANGE = default
+    RANGES.update(ranges)
+    _domains.clear()
+    _reads_by_key.clear()
+
+# Independent parts
+# =================
+# A conjunction whose conjuncts share no variables can be enumerated one
+# group at a time: `m == b ∧ k == 0` costs range² + range instead of
+# range³.
+
+def conjuncts(P: Condition) -> List[Condition]:
+    if isinstance(P, Conj):
+        return conjuncts(P.P) + conjuncts(P.Q)
+    return [P]
+
+Part = Tuple[Tuple[str, ...], List[Condition], List[Condition]]
+
+def independent_parts(hyps: List[Condition], goals: List[Condition]) -> List[Part]:
+    """
+    Groups `hyps` and `goals` into parts that read disjoint variables.
+    Each part is (variables, its hyps, its goals).
+    """
+    conds = [(P, True) for P in hyps] + [(P, False) for P in goals]
+    parent = list(range(len(conds)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    owner: Dict[str, int] = {}
+    for i, (P, _) in enumerate(conds):
+        for name in reads(P):
+            j = owner.setdefault(name, i)
+            parent[find(i)] = find(j)
+
+    parts: Dict[int, Tuple[Set[str], List[Condition], List[Condition]]] = {}
+    for i, (P, is_hyp) in enumerate(conds):
+        names, part_hyps, part_goals = parts.setdefault(find(i), (set(), [], []))
+        names |= reads(P)
+        (part_hyps if is_hyp else part_goals).append(P)
+    return [(tuple(sorted(names)), h, g) for names, h, g in parts.values()]
@@ -1,6 +1,12 @@
 from adt import adt, Case
 
-from typing import Callable, Tuple
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple, Union
+
+from conditions import Conj, Neg, Subst
+from domain import Domain, Part, conjuncts, domain_for, get_domain, independent_parts
+from memo import LRUCache, condition_key, key_scope
 
 State = dict[str, int]
 Condition = Callable[[State], bool]
@@ -17,7 +23,27 @@ class Stmt:
     IF_THEN_ELSE: Case[Callable[[State], bool], "Stmt", "Stmt"]
     WHILE_DO: Case[Callable[[State], bool], "Stmt"]
 
-def evaluate(stmt: Stmt, state: State) -> State:
+# Outcome of a budgeted run that did not reach a final state. `state` is
+# the state at the point where the run was cut off.
+@dataclass
+class Diverged:
+    state: State
+    steps: int
+    iterations: int
+
+# The run was cut off by its wall-clock deadline rather than its fuel
+class Timeout(Diverged):
+    pass
+
+Outcome = Union[State, Diverged]
+
+def evaluate(stmt: Stmt, state: State, fuel: Optional[int] = None, deadline: Optional[float] = None) -> Outcome:
+    # `fuel` bounds the number of statement steps, `deadline` is a
+    # `time.monotonic()` timestamp. With either one set, the run goes
+    # through `evaluate_iterative` and may return `Diverged`/`Timeout`.
+    if fuel is not None or deadline is not None:
+        return evaluate_iterative(stmt, state, fuel, deadline)
+
     return stmt.match(
         # skip (s):
         #     BigStep (Stmt.skip, s) s
@@ -61,6 +87,51 @@ def while_loopH(b: Callable[[State], bool], s: Stmt, state: State) -> State:
     else:
         return state
 
+# Same big-step semantics as `evaluate`, but without recursion: the
+# statements still to run are kept on an explicit work stack, so loops
+# with millions of iterations run in constant Python stack.
+def evaluate_iterative(stmt: Stmt, state: State, fuel: Optional[int] = None, deadline: Optional[float] = None) -> Outcome:
+    # `match` is expensive, so each node is only unfolded once per run
+    cases = {}
+    todo = [stmt]
+    steps = 0
+    iterations = 0
+    while todo:
+        if fuel is not None and steps >= fuel:
+            return Diverged(state, steps, iterations)
+        # reading the clock is slow, so only do it every 1024 steps
+        if deadline is not None and steps & 1023 == 0 and time.monotonic() >= deadline:
+            return Timeout(state, steps, iterations)
+        steps += 1
+
+        node = todo.pop()
+        case = cases.get(id(node))
+        if case is None:
+            case = cases[id(node)] = node.match(
+                skip=lambda: ("skip",),
+                assign=lambda x, a: ("assign", x, a),
+                seq=lambda s1, s2: ("seq", s1, s2),
+                if_then_else=lambda b, s1, s2: ("if_then_else", b, s1, s2),
+                while_do=lambda b, s: ("while_do", b, s),
+            )
+        kind = case[0]
+        if kind == "assign":
+            state = assignH(case[1], case[2], state)
+        elif kind == "seq":
+            # run s1, then s2
+            todo.append(case[2])
+            todo.append(case[1])
+        elif kind == "if_then_else":
+            todo.append(case[2] if case[1](state) else case[3])
+        elif kind == "while_do":
+            # while_true: run the body, then the loop again
+            # while_false: done, state unchanged
+            if case[1](state):
+                iterations += 1
+                todo.append(node)
+                todo.append(case[2])
+    return state
+
 # Magic functions
 # ===============
 # Some of the following functions are meant to do things that
@@ -69,20 +140,145 @@ def while_loopH(b: Callable[[State], bool], s: Stmt, state: State) -> State:
 # However, we describe the semantics of the function 
 # in the comments to assist you in synthesizing later proofs
 
-def check_equal(P1: Condition, P2: Condition) -> bool:
+# Result of a check: truthy iff it holds, otherwise carries the first
+# state where it fails
+@dataclass
+class CheckResult:
+    ok: bool
+    counterexample: Optional[State] = None
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+# When a proof runs under `obligations.deferred()`, side conditions are
+# handed to this instead of being checked on the spot
+DEFER: Optional[Callable[[Callable[[Condition, Condition], CheckResult], Condition, Condition], None]] = None
+
+def require(check: Callable[[Condition, Condition], CheckResult], P1: Condition, P2: Condition) -> None:
+    if DEFER is not None:
+        DEFER(check, P1, P2)
+        return
+    result = check(P1, P2)
+    assert result, f"{check.__name__} fails at {result.counterexample}"
+
+# Entailment backends decide a single check. `kind` is "equal" or
+# "implies", `domain` the states the check ranges over. Enumeration is
+# the default; see smt.py for an SMT solver backend.
+Backend = Callable[[str, Condition, Condition, Domain], CheckResult]
+
+def fails_on(kind: str, P1: Condition, P2: Condition) -> Callable[[State], bool]:
+    # the states that are counterexamples to the check
+    if kind == "equal":
+        # truth values, as the enumeration and bitset backends compare
+        return lambda s: bool(P1(s)) != bool(P2(s))
+    return lambda s: P1(s) and not P2(s)
+
+def enumerate_backend(kind: str, P1: Condition, P2: Condition, domain: Domain) -> CheckResult:
+    if kind == "equal":
+        # P1 = P2 iff P1 ⇒ P2 and P2 ⇒ P1, which can be split up
+        result = enumerate_backend("implies", P1, P2, domain)
+        return result if not result else enumerate_backend("implies", P2, P1, domain)
+
+    parts = independent_parts(conjuncts(P1), conjuncts(P2))
+    if len(parts) > 1:
+        return _implies_by_parts(parts)
+
+    fails = fails_on(kind, P1, P2)
+    for state in domain.states:
+        if fails(state):
+            return CheckResult(False, state)
+    return CheckResult(True)
+
+def _first(P: Callable[[State], bool], domain: Domain) -> Optional[State]:
+    return next((state for state in domain.states if P(state)), None)
+
+def _implies_by_parts(parts: List[Part]) -> CheckResult:
+    # With P1 = H1 ∧ ... ∧ Hn and P2 = G1 ∧ ... ∧ Gn split into parts over
+    # disjoint variables, P1 ⇒ P2 iff some Hi is unsatisfiable or every
+    # Hi ⇒ Gi. A counterexample is a failing state of one part, joined
+    # with states satisfying the hypotheses of all the others.
+    failure = None
+    for failed, (names, hyps, goals) in enumerate(parts):
+        if goals:
+            failure = _first(lambda s: all(H(s) for H in hyps) and not all(G(s) for G in goals),
+                             get_domain(names))
+            if failure is not None:
+                break
+    if failure is None:
+        return CheckResult(True)
+
+    counterexample = {}
+    for i, (names, hyps, goals) in enumerate(parts):
+        if i == failed:
+            continue
+        witness = _first(lambda s: all(H(s) for H in hyps), get_domain(names))
+        if witness is None:
+            # P1 never holds
+            return CheckResult(True)
+        counterexample.update(witness)
+    counterexample.update(failure)
+    return CheckResult(False, counterexample)
+
+BACKEND: Backend = enumerate_backend
+
+def set_backend(backend: Backend) -> None:
+    global BACKEND
+    BACKEND = backend
+
+# Results of past checks, keyed on the backend, the two conditions and
+# the domain. `CHECK_CACHE.stats()` reports hits/misses/evictions, and
+# `saved_s` how much checking time the hits skipped.
+CHECK_CACHE = LRUCache(maxsize=4096)
+
+def _cached_check(kind: str, P1: Condition, P2: Condition) -> CheckResult:
+    if P1 is P2:
+        return CheckResult(True)
+    k1, k2 = condition_key(P1), condition_key(P2)
+    if k1 == k2:
+        # the same condition, built twice (e.g. `Conj(I, B)` by a proof
+        # and again by `while_intro`)
+        return CheckResult(True)
+
+    domain = domain_for(P1, P2)
+    key = (kind, BACKEND, k1, k2, domain.key)
+    entry = CHECK_CACHE.get(key)
+    if entry is not None:
+        return entry[0]
+
+    start = time.perf_counter()
+    result = BACKEND(kind, P1, P2, domain)
+    # keep P1 and P2 alive so identity-based keys stay valid
+    CHECK_CACHE.put(key, (result, (P1, P2)), cost=time.perf_counter() - start)
+    return result
+
+# When set, called with (kind, P1, P2, result, seconds) after every
+# check, see profiler.py
+OBSERVE: Optional[Callable[[str, Condition, Condition, CheckResult, float], None]] = None
+
+def _observed_check(kind: str, P1: Condition, P2: Condition) -> CheckResult:
+    if OBSERVE is None:
+        with key_scope():
+            return _cached_check(kind, P1, P2)
+    start = time.perf_counter()
+    with key_scope():
+        result = _cached_check(kind, P1, P2)
+    OBSERVE(kind, P1, P2, result, time.perf_counter() - start)
+    return result
+
+def check_equal(P1: Condition, P2: Condition) -> CheckResult:
     # this represents all possible states
-    states = [{"x": x, "y": y} for x in range(10) for y in range(10)]
-    return all(P1(state) == P2(state) for state in states)
+    # (see domain.py: every variable P1 or P2 reads, over a finite range)
+    return _observed_check("equal", P1, P2)
 
 # P1 ⇒ P2
-def check_implies(P1: Condition, P2: Condition) -> bool:
+def check_implies(P1: Condition, P2: Condition) -> CheckResult:
     # this represents all possible states
-    states = [{"x": x, "y": y} for x in range(10) for y in range(10)]
-    return all((not P1(state)) or P2(state) for state in states)
+    return _observed_check("implies", P1, P2)
 
 # represents Q[a/x]
 def subst(P: Condition, a: Callable[[State], int], x: str) -> Condition:
-    return lambda s: P({**s, x: a(s)})
+    # same as `lambda s: P({**s, x: a(s)})`, see conditions.py
+    return Subst(P, a, x)
 
 # Hoare Logic rules
 # =================
@@ -134,7 +330,7 @@ def seq_intro(HT1: HoareTriple, HT2: HoareTriple) -> HoareTriple:
     P1, S1, R = HT1
     R2, S2, Q = HT2
 
-    assert check_equal(R, R2)
+    require(check_equal, R, R2)
 
     return (P1, Stmt.SEQ(S1, S2), Q)
 
@@ -154,11 +350,11 @@ def if_intro(P: Condition, B: Callable[[State], bool], HT1: HoareTriple, HT2: Ho
     P1, S1, Q1 = HT1
     P2, S2, Q2 = HT2
 
-    assert check_equal(P1, lambda s: P(s) and B(s))
-    assert check_equal(P2, lambda s: P(s) and not B(s))
-    assert check_equal(Q1, Q2)
+    require(check_equal, P1, Conj(P, B))
+    require(check_equal, P2, Conj(P, Neg(B)))
+    require(check_equal, Q1, Q2)
 
-    return (P, Stmt.IF_THEN_ELSE(B, S1, S2), Q)
+    return (P, Stmt.IF_THEN_ELSE(B, S1, S2), Q1)
 
 # Corresponds to Lean:
 # theorem while_intro (P) {B S}
@@ -173,10 +369,10 @@ def while_intro(I: Condition, B: Callable[[State], bool], HT: HoareTriple) -> Ho
     """
     P, S, Q = HT
 
-    assert check_equal(P, lambda s: I(s) and B(s))
-    assert check_equal(Q, I)
+    require(check_equal, P, Conj(I, B))
+    require(check_equal, Q, I)
 
-    return (I, Stmt.WHILE_DO(B, S), lambda s: I(s) and not B(s))
+    return (I, Stmt.WHILE_DO(B, S), Conj(I, Neg(B)))
 
 # Corresponds to Lean:
 # theorem consequence {P P' Q Q' S}
@@ -193,8 +389,8 @@ def consequence(Pp: Condition, HT: HoareTriple, Qp: Condition) -> HoareTriple:
     """
     P, S, Q = HT
 
-    assert check_implies(Pp, P)
-    assert check_implies(Q, Qp)
+    require(check_implies, Pp, P)
+    require(check_implies, Q, Qp)
 
     return (Pp, S, Qp)
 
@@ -246,6 +442,11 @@ ADD = Stmt.WHILE_DO(
 )
 
 #### ORIGINAL PROOF 1
+# {n = a ∧ m = b} ADD {n = 0 ∧ m = a + b}
+def add_proof(a, b):
+    P = lambda s: s["n"] == a and s["m"] == b
+    Q = lambda s: s["n"] == 0 and s["m"] == a + b
+
     I = lambda s: s["m"] + s["n"] == a + b
     
     # Condition for the while loop
@@ -326,7 +527,7 @@ MUL = Stmt.SEQ(
 
 # {n = a ∧ m = b} MUL {r = a * b}
 
-(a, b)
+# (a, b)
 
 P = lambda s: s["n"] == a and s["m"] == b
 Q = lambda s: s["r"] == a * b
@@ -0,0 +1,736 @@
+import hashlib
+import json
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from corpus import PROGRAM_DIR
+from hoare import State, Stmt
+from memo import LRUCache
+from symbolic import ARITH, COMPARE, Sym, SymState, Untraceable, trace
+
+# IMP syntax
+# ==========
+# A concrete syntax for `Stmt`, so programs can be stored and loaded
+# without executing Python:
+#
+#     r := 0;
+#     while n != 0 do
+#       r := r + m;
+#       n := n - 1
+#     end
+#
+# Statements are `skip`, `x := e`, `if b then S else S end`,
+# `while b do S end`, `S; S`, and `(S)` for grouping. Expressions are
+# integers, `true`/`false`, variables, `+ - * / %` (`/` is floor
+# division), comparisons `= != < <= > >=`, and `not`, `and`, `or`, with
+# the usual precedence. Identifiers are state variables, unless they
+# are bound by `params` when the program is built (e.g. N in GAUSS).
+#
+# The parser produces an AST of nested lists, the same one JSON holds:
+#
+#     ["assign", "r", ["+", ["var", "r"], ["var", "m"]]]
+#
+# Expression nodes use the operator names of symbolic.py ("var",
+# "const", "neg", ARITH, COMPARE, "ite") plus "not", "and" and "or".
+# A right-nested chain of SEQs is one flat ["seq", s1, ..., sn].
+#
+# `build` turns an AST into a `Stmt` whose guards and expressions are
+# ordinary lambdas, compiled once per distinct expression, with the
+# expression's AST in their `ast` attribute. Going back, `to_ast`
+# reads those attributes. For lambdas written in Python, it traces them
+# (symbolic.py) instead, so existing programs serialize as well.
+#
+#     MUL = parse(source)
+#     dumps(MUL) / loads(data)            # compact binary
+#     to_json(MUL) / from_json(text)
+#     unparse(MUL)                        # back to text
+#     load_imp("GAUSS", N=5)              # programs/GAUSS.imp, cached
+#
+# Input that does not describe a program, in any of the three formats,
+# raises ParseError with the problem and where it is.
+
+Ast = List[Any]
+
+class ParseError(ValueError):
+    """Text, JSON or binary input that does not describe a program."""
+
+# Lexer
+# =====
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+      (?P<int>\d+)
+    | (?P<name>[A-Za-z_][A-Za-z_0-9]*)
+    | (?P<op>:=|==|!=|<=|>=|[-+*/%=<>();])
+    | (?P<comment>\#[^\n]*)
+    | (?P<end>$)
+    | (?P<bad>.)
+    )""", re.VERBOSE)
+
+KEYWORDS = {"skip", "if", "then", "else", "end", "while", "do", "true", "false", "not", "and", "or"}
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z_0-9]*")
+
+Token = Tuple[str, Any, int]
+
+def tokenize(source: str) -> List[Token]:
+    """(kind, value, offset) triples; kind is "int", "name", "op" or "end"."""
+    tokens: List[Token] = []
+    pos = 0
+    while True:
+        m = _TOKEN.match(source, pos)
+        kind = m.lastgroup
+        start = m.start(kind)
+        pos = m.end()
+        if kind == "comment":
+            continue
+        if kind == "bad":
+            raise ParseError(f"unexpected {m.group(kind)!r} at {_where(source, start)}")
+        if kind == "int":
+            tokens.append(("int", int(m.group(kind)), start))
+        elif kind == "name":
+            word = m.group(kind)
+            tokens.append(("op" if word in KEYWORDS else "name", word, start))
+        elif kind == "op":
+            tokens.append(("op", m.group(kind), start))
+        else:
+            tokens.append(("end", None, start))
+            return tokens
+
+def _where(source: str, offset: int) -> str:
+    line = source.count("\n", 0, offset) + 1
+    column = offset - source.rfind("\n", 0, offset)
+    return f"line {line}, column {column}"
+
+# Parser
+# ======
+
+# binary operators by precedence level, loosest first
+_LEVELS = [("or",), ("and",), None, COMPARE, ("+", "-"), ("*", "//", "%")]
+_SPELLING = {"=": "==", "/": "//"}
+
+class _Parser:
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.tokens = tokenize(source)
+        self.pos = 0
+
+    def peek(self) -> Token:
+        return self.tokens[self.pos]
+
+    def error(self, expected: str) -> ParseError:
+        kind, value, offset = self.peek()
+        found = "end of input" if kind == "end" else repr(value)
+        return ParseError(f"expected {expected}, found {found} at {_where(self.source, offset)}")
+
+    def accept(self, op: str) -> bool:
+        kind, value, _ = self.tokens[self.pos]
+        if kind == "op" and value == op:
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, op: str) -> None:
+        if not self.accept(op):
+            raise self.error(repr(op))
+
+    def program(self) -> Ast:
+        stmt = self.seq()
+        if self.peek()[0] != "end":
+            raise self.error("';' or end of input")
+        return stmt
+
+    def seq(self) -> Ast:
+        stmts = [self.simple()]
+        while self.accept(";"):
+            stmts.append(self.simple())
+        return stmts[0] if len(stmts) == 1 else ["seq"] + stmts
+
+    def simple(self) -> Ast:
+        kind, value, _ = self.peek()
+        if kind == "name":
+            self.pos += 1
+            self.expect(":=")
+            return ["assign", value, self.expr()]
+        if kind != "op":
+            raise self.error("a statement")
+        if self.accept("skip"):
+            return ["skip"]
+        if self.accept("if"):
+            b = self.expr()
+            self.expect("then")
+            s1 = self.seq()
+            self.expect("else")
+            s2 = self.seq()
+            self.expect("end")
+            return ["if", b, s1, s2]
+        if self.accept("while"):
+            b = self.expr()
+            self.expect("do")
+            s = self.seq()
+            self.expect("end")
+            return ["while", b, s]
+        if self.accept("("):
+            # (a; b); c is SEQ(SEQ(a, b), c)
+            s = self.seq()
+            self.expect(")")
+            return s
+        raise self.error("a statement")
+
+    def expr(self, level: int = 0) -> Ast:
+        if level == len(_LEVELS):
+            return self.unary()
+        if _LEVELS[level] is None:
+            # `not` binds looser than comparisons, tighter than `and`
+            if self.accept("not"):
+                return ["not", self.expr(level)]
+            return self.expr(level + 1)
+        ops = _LEVELS[level]
+        left = self.expr(level + 1)
+        while True:
+            kind, value, _ = self.peek()
+            op = _SPELLING.get(value, value)
+            if kind != "op" or op not in ops:
+                return left
+            self.pos += 1
+            right = self.expr(level + 1)
+            left = [op, left, right]
+            if op in COMPARE:
+                # a < b < c would mean different things here and in Python
+                kind, value, offset = self.peek()
+                if kind == "op" and _SPELLING.get(value, value) in COMPARE:
+                    raise ParseError(f"comparisons do not chain, at {_where(self.source, offset)}")
+                return left
+
+    def unary(self) -> Ast:
+        kind, value, _ = self.peek()
+        if kind == "int":
+            self.pos += 1
+            return ["const", value]
+        if kind == "name":
+            self.pos += 1
+            return ["var", value]
+        if self.accept("true"):
+            return ["const", True]
+        if self.accept("false"):
+            return ["const", False]
+        if self.accept("-"):
+            # -3 is a constant, -(3) and -x are negations
+            kind, value, _ = self.peek()
+            if kind == "int":
+                self.pos += 1
+                return ["const", -value]
+            return ["neg", self.unary()]
+        if self.accept("("):
+            e = self.expr()
+            self.expect(")")
+            return e
+        raise self.error("an expression")
+
+def parse_ast(source: str) -> Ast:
+    return _Parser(source).program()
+
+def parse(source: str, **params: int) -> Stmt:
+    return _build(parse_ast(source), params)
+
+def parse_expr(source: str, **params: int) -> Callable[[State], Any]:
+    """A condition or expression, e.g. `parse_expr("n = a and m = b", a=3, b=4)`."""
+    parser = _Parser(source)
+    e = parser.expr()
+    if parser.peek()[0] != "end":
+        raise parser.error("end of input")
+    return expression(bind(e, params))
+
+# Building
+# ========
+
+_PYTHON = {"and": "({} and {})", "or": "({} or {})", **{op: f"({{}} {op} {{}})" for op in ARITH + COMPARE}}
+
+def python_source(e: Ast) -> str:
+    op = e[0]
+    if op == "var":
+        return f"s[{e[1]!r}]"
+    if op == "const":
+        return repr(e[1])
+    if op == "neg":
+        return f"(-{python_source(e[1])})"
+    if op == "not":
+        return f"(not {python_source(e[1])})"
+    if op == "ite":
+        c, t, f = (python_source(arg) for arg in e[1:])
+        return f"({t} if {c} else {f})"
+    if op not in _PYTHON:
+        raise ParseError(f"unknown operator {op!r}")
+    return _PYTHON[op].format(python_source(e[1]), python_source(e[2]))
+
+def bind(e: Ast, params: Dict[str, int]) -> Ast:
+    """`e` with the variables in `params` replaced by their values."""
+    if not params:
+        return e
+    if e[0] == "var":
+        return ["const", params[e[1]]] if e[1] in params else e
+    if e[0] == "const":
+        return e
+    return [e[0]] + [bind(arg, params) for arg in e[1:]]
+
+# one lambda per distinct expression source
+_lambdas = LRUCache(maxsize=65536)
+
+def expression(e: Ast) -> Callable[[State], Any]:
+    source = "lambda s: " + python_source(e)
+    f = _lambdas.get(source)
+    if f is None:
+        try:
+            code = compile(source, "<imp>", "eval")
+        except (SyntaxError, RecursionError, MemoryError):
+            # Python's own parser limits how deeply parentheses nest
+            raise ParseError("expression is nested too deeply") from None
+        f = eval(code, {"__builtins__": {}})
+        f.ast = e
+        _lambdas.put(source, f)
+    return f
+
+def build(ast: Ast, params: Optional[Dict[str, int]] = None) -> Stmt:
+    """The `Stmt` of `ast`, after `check_ast`."""
+    return _build(check_ast(ast), params or {})
+
+def _build(ast: Ast, params: Dict[str, int]) -> Stmt:
+    op = ast[0]
+    if op == "skip":
+        return Stmt.SKIP()
+    if op == "assign":
+        return Stmt.ASSIGN(ast[1], expression(bind(ast[2], params)))
+    if op == "seq":
+        parts = [_build(s, params) for s in ast[1:]]
+        stmt = parts[-1]
+        for part in reversed(parts[:-1]):
+            stmt = Stmt.SEQ(part, stmt)
+        return stmt
+    if op == "if":
+        return Stmt.IF_THEN_ELSE(expression(bind(ast[1], params)), _build(ast[2], params), _build(ast[3], params))
+    if op == "while":
+        return Stmt.WHILE_DO(expression(bind(ast[1], params)), _build(ast[2], params))
+    raise ParseError(f"not a statement: {op!r}")
+
+# Checking
+# ========
+# ASTs from JSON, binary data or callers are checked before they are
+# built, so a bad program fails with a ParseError that names the
+# problem rather than whatever error building it happens to hit.
+
+_STATEMENTS = {"skip": 0, "assign": 2, "if": 3, "while": 2}
+_EXPRESSIONS = {"var": 1, "const": 1, "neg": 1, "not": 1, "ite": 3, "and": 2, "or": 2,
+                **{op: 2 for op in ARITH + COMPARE}}
+
+def _node(node: Any, what: str) -> str:
+    if not isinstance(node, list) or not node or not isinstance(node[0], str):
+        raise ParseError(f"expected {what} node, found {node!r:.60}")
+    return node[0]
+
+def _check_arity(node: Ast, arity: int) -> None:
+    if len(node) - 1 != arity:
+        raise ParseError(f"{node[0]!r} takes {arity} argument(s), found {len(node) - 1}")
+
+def _check_expr(e: Any) -> None:
+    op = _node(e, "an expression")
+    if op not in _EXPRESSIONS:
+        raise ParseError(f"unknown operator {op!r}")
+    _check_arity(e, _EXPRESSIONS[op])
+    if op == "var":
+        if not isinstance(e[1], str):
+            raise ParseError(f"variable name {e[1]!r} is not a string")
+    elif op == "const":
+        if type(e[1]) not in (int, bool):
+            raise ParseError(f"constant {e[1]!r} is not an integer or a boolean")
+    else:
+        for arg in e[1:]:
+            _check_expr(arg)
+
+def _check_stmt(s: Any) -> None:
+    op = _node(s, "a statement")
+    if op == "seq":
+        if len(s) < 2:
+            raise ParseError("'seq' needs at least one statement")
+        for part in s[1:]:
+            _check_stmt(part)
+        return
+    if op not in _STATEMENTS:
+        raise ParseError(f"not a statement: {op!r}")
+    _check_arity(s, _STATEMENTS[op])
+    if op == "assign":
+        if not isinstance(s[1], str):
+            raise ParseError(f"variable name {s[1]!r} is not a string")
+        _check_expr(s[2])
+    elif op == "if":
+        _check_expr(s[1])
+        _check_stmt(s[2])
+        _check_stmt(s[3])
+    elif op == "while":
+        _check_expr(s[1])
+        _check_stmt(s[2])
+
+def check_ast(ast: Any) -> Ast:
+    """`ast`, if it is a well-formed program; otherwise raises ParseError."""
+    try:
+        _check_stmt(ast)
+    except RecursionError:
+        raise ParseError("program is nested too deeply") from None
+    return ast
+
+# Back to ASTs
+# ============
+
+def _from_sym(e: Sym) -> Ast:
+    op = e.op
+    if op == "var":
+        return ["var", e.args[0]]
+    if op == "const":
+        value = e.args[0]
+        if not isinstance(value, int):
+            raise ValueError(f"constant {value!r} has no IMP syntax")
+        return ["const", value]
+    args = [_from_sym(arg) for arg in e.args]
+    if op == "ite":
+        # how the tracer joins `and`, `or` and `not`
+        c, t, f = args
+        if f == c:
+            return ["and", c, t]
+        if t == c:
+            return ["or", c, f]
+        if t == ["const", False] and f == ["const", True]:
+            return ["not", c]
+    return [op] + args
+
+def expr_ast(f: Callable[[State], Any]) -> Ast:
+    e = getattr(f, "ast", None)
+    if e is not None:
+        return e
+    try:
+        return _from_sym(trace(f, SymState()))
+    except Untraceable as err:
+        raise ValueError(f"cannot serialize {f!r}: {err}") from None
+
+def to_ast(stmt: Stmt) -> Ast:
+    def seq(s1: Stmt, s2: Stmt) -> Ast:
+        # flatten the right spine only, so `build` gives back the same tree
+        stmts = [to_ast(s1)]
+        rest = s2
+        while True:
+            parts = rest.match(skip=lambda: None, assign=lambda x, a: None, seq=lambda a, b: (a, b),
+                               if_then_else=lambda b, t, e: None, while_do=lambda b, s: None)
+            if parts is None:
+                break
+            first, rest = parts
+            stmts.append(to_ast(first))
+        stmts.append(to_ast(rest))
+        return ["seq"] + stmts
+
+    return stmt.match(
+        skip=lambda: ["skip"],
+        assign=lambda x, a: ["assign", x, expr_ast(a)],
+        seq=seq,
+        if_then_else=lambda b, s1, s2: ["if", expr_ast(b), to_ast(s1), to_ast(s2)],
+        while_do=lambda b, s: ["while", expr_ast(b), to_ast(s)],
+    )
+
+# Text
+# ====
+
+_TEXT = {"==": "=", "//": "/"}
+# how tightly each operator binds, for parentheses
+_PRECEDENCE = {op: level for level, ops in enumerate(_LEVELS) if ops for op in ops}
+_PRECEDENCE["not"] = 2
+
+def _identifier(x: str) -> str:
+    # a name the lexer reads back as the same variable
+    if x in KEYWORDS:
+        raise ValueError(f"variable {x!r} is an IMP keyword")
+    if not _IDENTIFIER.fullmatch(x):
+        raise ValueError(f"variable {x!r} is not an IMP identifier")
+    return x
+
+def unparse_expr(e: Ast, context: int = 0) -> str:
+    op = e[0]
+    if op == "var":
+        return _identifier(e[1])
+    if op == "const":
+        value = e[1]
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        # -3 reads back as a constant, except right after another minus
+        return f"({value})" if value < 0 and context == len(_LEVELS) else str(value)
+    if op == "neg":
+        arg = e[1]
+        if arg[0] == "const" and not isinstance(arg[1], bool) and arg[1] >= 0:
+            # -3 would read back as the constant -3
+            return f"-({arg[1]})"
+        return f"-{unparse_expr(arg, len(_LEVELS))}"
+    if op == "ite":
+        raise ValueError("conditional expressions have no IMP syntax")
+    level = _PRECEDENCE[op]
+    if op == "not":
+        text = f"not {unparse_expr(e[1], level)}"
+    else:
+        # left-associative; comparisons do not chain
+        right = level + 1
+        left = level + 1 if op in COMPARE else level
+        text = f"{unparse_expr(e[1], left)} {_TEXT.get(op, op)} {unparse_expr(e[2], right)}"
+    return f"({text})" if level < context else text
+
+def unparse(stmt: Stmt) -> str:
+    return _unparse(to_ast(stmt), "")
+
+def _unparse(ast: Ast, indent: str) -> str:
+    op = ast[0]
+    inner = indent + "  "
+    if op == "skip":
+        return f"{indent}skip"
+    if op == "assign":
+        return f"{indent}{_identifier(ast[1])} := {unparse_expr(ast[2])}"
+    if op == "seq":
+        if len(ast) == 2:
+            return f"{indent}(\n{_unparse(ast[1], inner)}\n{indent})"
+        return ";\n".join(
+            # a SEQ on the left needs its own group
+            _unparse(["seq", s] if s[0] == "seq" else s, indent) for s in ast[1:]
+        )
+    if op == "if":
+        return (f"{indent}if {unparse_expr(ast[1])} then\n{_unparse(ast[2], inner)}\n"
+                f"{indent}else\n{_unparse(ast[3], inner)}\n{indent}end")
+    if op == "while":
+        return f"{indent}while {unparse_expr(ast[1])} do\n{_unparse(ast[2], inner)}\n{indent}end"
+    raise ValueError(f"not a statement: {op!r}")
+
+# JSON
+# ====
+
+def to_json(stmt: Stmt) -> str:
+    return json.dumps(to_ast(stmt), separators=(",", ":"))
+
+def from_json(text: str, **params: int) -> Stmt:
+    try:
+        ast = json.loads(text)
+    except ValueError as e:
+        raise ParseError(f"not JSON: {e}") from None
+    except RecursionError:
+        raise ParseError("program is nested too deeply") from None
+    return build(ast, params)
+
+# Binary
+# ======
+# "IMP" 1, the variable names (count, then length-prefixed UTF-8), then
+# the AST in preorder: one opcode byte per node, varints for name
+# indexes, child counts of SEQ and (zigzag) integer constants.
+
+MAGIC = b"IMP\x01"
+_OPCODES = ["skip", "assign", "seq", "if", "while", "var", "int", "true", "false",
+            "neg", "not", "and", "or", "ite", *ARITH, *COMPARE]
+_OPCODE = {op: i for i, op in enumerate(_OPCODES)}
+_ARITY = {"neg": 1, "not": 1, "ite": 3, "and": 2, "or": 2, **{op: 2 for op in ARITH + COMPARE}}
+
+def _varint(n: int, out: bytearray) -> None:
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+def dumps_ast(ast: Ast) -> bytes:
+    check_ast(ast)
+    names: Dict[str, int] = {}
+    body = bytearray()
+
+    def name(x: str) -> None:
+        index = names.get(x)
+        if index is None:
+            index = names[x] = len(names)
+        _varint(index, body)
+
+    def expr(e: Ast) -> None:
+        op = e[0]
+        if op == "var":
+            body.append(_OPCODE["var"])
+            name(e[1])
+        elif op == "const":
+            value = e[1]
+            if isinstance(value, bool):
+                body.append(_OPCODE["true" if value else "false"])
+            else:
+                body.append(_OPCODE["int"])
+                _varint(value * 2 if value >= 0 else -value * 2 - 1, body)
+        else:
+            body.append(_OPCODE[op])
+            for arg in e[1:]:
+                expr(arg)
+
+    def stmt(s: Ast) -> None:
+        op = s[0]
+        body.append(_OPCODE[op])
+        if op == "assign":
+            name(s[1])
+            expr(s[2])
+        elif op == "seq":
+            _varint(len(s) - 1, body)
+            for part in s[1:]:
+                stmt(part)
+        elif op == "if":
+            expr(s[1])
+            stmt(s[2])
+            stmt(s[3])
+        elif op == "while":
+            expr(s[1])
+            stmt(s[2])
+
+    stmt(ast)
+    out = bytearray(MAGIC)
+    _varint(len(names), out)
+    for x in names:
+        encoded = x.encode()
+        _varint(len(encoded), out)
+        out += encoded
+    return bytes(out + body)
+
+def loads_ast(data: bytes) -> Ast:
+    if data[:len(MAGIC)] != MAGIC:
+        raise ParseError("not an IMP program")
+    pos = len(MAGIC)
+
+    def byte() -> int:
+        nonlocal pos
+        if pos >= len(data):
+            raise ParseError(f"truncated IMP data ({len(data)} bytes)")
+        pos += 1
+        return data[pos - 1]
+
+    def varint() -> int:
+        n = shift = 0
+        while True:
+            b = byte()
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                return n
+            shift += 7
+
+    def opcode() -> str:
+        b = byte()
+        if b >= len(_OPCODES):
+            raise ParseError(f"unknown opcode {b} at byte {pos - 1}")
+        return _OPCODES[b]
+
+    def name() -> str:
+        index = varint()
+        if index >= len(names):
+            raise ParseError(f"name index {index} out of range at byte {pos}")
+        return names[index]
+
+    names = []
+    for _ in range(varint()):
+        length = varint()
+        if pos + length > len(data):
+            raise ParseError(f"truncated IMP data ({len(data)} bytes)")
+        try:
+            names.append(data[pos:pos + length].decode())
+        except UnicodeDecodeError:
+            raise ParseError(f"name at byte {pos} is not UTF-8") from None
+        pos += length
+
+    def expr() -> Ast:
+        op = opcode()
+        if op == "var":
+            return ["var", name()]
+        if op == "int":
+            n = varint()
+            return ["const", n >> 1 if not n & 1 else -((n + 1) >> 1)]
+        if op in ("true", "false"):
+            return ["const", op == "true"]
+        if op not in _ARITY:
+            raise ParseError(f"{op!r} is not an expression, at byte {pos - 1}")
+        return [op] + [expr() for _ in range(_ARITY[op])]
+
+    def stmt() -> Ast:
+        op = opcode()
+        if op == "skip":
+            return ["skip"]
+        if op == "assign":
+            x = name()
+            return ["assign", x, expr()]
+        if op == "seq":
+            count = varint()
+            if count == 0:
+                raise ParseError(f"empty 'seq' at byte {pos}")
+            return ["seq"] + [stmt() for _ in range(count)]
+        if op == "if":
+            return ["if", expr(), stmt(), stmt()]
+        if op == "while":
+            return ["while", expr(), stmt()]
+        raise ParseError(f"not a statement: {op!r}, at byte {pos - 1}")
+
+    try:
+        ast = stmt()
+    except RecursionError:
+        raise ParseError("program is nested too deeply") from None
+    if pos != len(data):
+        raise ParseError(f"{len(data) - pos} bytes after the end of the program")
+    return ast
+
+def dumps(stmt: Stmt) -> bytes:
+    return dumps_ast(to_ast(stmt))
+
+def loads(data: bytes, **params: int) -> Stmt:
+    # `loads_ast` only builds well-formed ASTs
+    return _build(loads_ast(data), params)
+
+# Corpus
+# ======
+# `programs/*.imp` hold the same programs as the `.test` files, in IMP
+# syntax. Parsed programs are kept as JSON under `programs/__pycache__`,
+# keyed on the source and AST_VERSION, and in memory by path and
+# modification time.
+# JSON rather than binary, since `json.loads` decodes faster than the
+# binary decoder (in Python) does; binary is the compact format for
+# storing and shipping many programs.
+
+# bump when the grammar or the AST format changes, so cached ASTs from
+# an older parser are not used
+AST_VERSION = 1
+
+_parsed = LRUCache(maxsize=1024)
+
+def imp_names(directory: str = PROGRAM_DIR) -> List[str]:
+    return sorted(f[:-len(".imp")] for f in os.listdir(directory) if f.endswith(".imp"))
+
+def load_imp_ast(name: str, directory: str = PROGRAM_DIR) -> Ast:
+    path = os.path.join(directory, name + ".imp")
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    ast = _parsed.get(key)
+    if ast is not None:
+        return ast
+
+    with open(path, "rb") as f:
+        source = f.read()
+    cache_dir = os.path.join(directory, "__pycache__")
+    digest = hashlib.sha1(source).hexdigest()[:16]
+    cached = os.path.join(cache_dir, f"{name}.{digest}.v{AST_VERSION}.imp.json")
+    try:
+        with open(cached, "rb") as f:
+            ast = check_ast(json.loads(f.read()))
+    except (OSError, ValueError):
+        ast = parse_ast(source.decode())
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            # write then rename, so parallel loads never read half a file
+            tmp = f"{cached}.{os.getpid()}"
+            with open(tmp, "w") as f:
+                json.dump(ast, f, separators=(",", ":"))
+            os.replace(tmp, cached)
+        except OSError:
+            pass
+    _parsed.put(key, ast)
+    return ast
+
+def load_imp(name: str, directory: str = PROGRAM_DIR, **params: int) -> Stmt:
+    return _build(load_imp_ast(name, directory), params)
+
+def load_imp_corpus(directory: str = PROGRAM_DIR, **params: int) -> Dict[str, Stmt]:
+    """Every `.imp` program in `directory`, with `params` bound in each."""
+    return {name: load_imp(name, directory, **params) for name in imp_names(directory)}
@@ -0,0 +1,291 @@
+import itertools
+from dataclasses import dataclass
+from math import gcd
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from batch import Batch, _Run, stack_states
+from conditions import Conj
+from hoare import Condition, State, Stmt, check_equal, check_implies
+from vcgen import Invariants, loops, vcgen
+
+# Invariant mining
+# ================
+# Guesses loop invariants from executions. The program runs on many
+# inputs at once (batch.py), and every state reaching the head of a
+# WHILE_DO is recorded, together with ghost copies of the input
+# variables (`n0` is the value `n` started with). Then a library of
+# candidate invariants is tested against all recorded states:
+#
+#   equalities  c1*t1 + ... + c4*t4 == c, where the t are variables,
+#               ghosts, or products of two of them, the ci are small
+#               integers, and c is whatever the states agree on
+#   bounds      v >= lo, v <= hi, and v <= w between two variables
+#
+# Equalities are filtered as one big matrix product: residuals of every
+# (terms, coefficients) pair over a sample of the states first, over
+# all states for the few that survive that.
+#
+# Surviving candidates are ranked (equalities first, then fewer and
+# simpler terms) and bound to the proof's parameters through the
+# ghosts, e.g. {"n0": a, "m0": b}. The ones that are not inductive are
+# then dropped Houdini-style: keep only candidates preserved by the
+# loop body under the conjunction of all candidates left, until
+# nothing changes. What remains satisfies while_intro's side condition
+# I ∧ B ⇒ wp(S, I) as a conjunction.
+#
+#     inputs = [{"n": n, "m": m} for n in range(10) for m in range(10)]
+#     mined = mine(MUL, inputs, ghosts={"n0": a, "m0": b})
+#     I = conjoin(mined[loop])
+
+GHOST = "{}0"
+
+# coefficients tried for each term of an equality
+COEFFS = (1, -1, 2, -2)
+
+# states the first filtering pass runs on
+PROBE_ROWS = 64
+
+# residuals computed at once in the first pass, to bound memory
+CHUNK = 1 << 22
+
+@dataclass
+class Candidate:
+    # (coefficient, factors) per term; a factor is a variable or a ghost
+    terms: Tuple[Tuple[int, Tuple[str, ...]], ...]
+    op: str
+    const: int
+
+    @property
+    def kind(self) -> str:
+        return "equality" if self.op == "==" else "bound"
+
+    def rank(self) -> Tuple:
+        return (
+            self.kind != "equality",
+            len(self.terms),
+            max(len(factors) for _, factors in self.terms),
+            sum(abs(c) for c, _ in self.terms),
+            str(self),
+        )
+
+    def __str__(self) -> str:
+        return f"{_render(self.terms, lambda name: name)} {self.op} {self.const}"
+
+    def condition(self, ghosts: Dict[str, int]) -> Condition:
+        """The candidate as a condition, with the ghosts replaced by values."""
+        def factor(name: str) -> str:
+            return repr(ghosts[name]) if name in ghosts else f's["{name}"]'
+        source = f"lambda s: {_render(self.terms, factor)} {self.op} {self.const}"
+        # one namespace for all, so equal sources get equal condition keys
+        return eval(source, _NAMESPACE)
+
+_NAMESPACE: Dict[str, object] = {}
+
+def _render(terms: Iterable[Tuple[int, Tuple[str, ...]]], factor) -> str:
+    out = ""
+    for c, factors in terms:
+        product = " * ".join(factor(name) for name in factors)
+        sign = "-" if c < 0 else "+"
+        scaled = product if abs(c) == 1 else f"{abs(c)} * {product}"
+        out = f"{'-' if c < 0 else ''}{scaled}" if not out else f"{out} {sign} {scaled}"
+    return out
+
+TRUE: Condition = lambda s: True
+
+def conjoin(candidates: List[Candidate], ghosts: Dict[str, int]) -> Condition:
+    I = TRUE
+    for candidate in reversed(candidates):
+        cond = candidate.condition(ghosts)
+        I = cond if I is TRUE else Conj(cond, I)
+    return I
+
+# Loop heads
+# ==========
+
+class _Recorder(_Run):
+    def __init__(self, batch: Batch, lanes: int, fuel: Optional[int]) -> None:
+        super().__init__(batch, lanes, fuel)
+        self.heads: Dict[Stmt, List[Tuple[np.ndarray, Batch]]] = {}
+
+    def at_loop_head(self, loop: Stmt, lanes: np.ndarray) -> None:
+        index = np.flatnonzero(lanes)
+        if index.size:
+            snapshot = {name: values[index] for name, values in self.batch.items()}
+            self.heads.setdefault(loop, []).append((index, snapshot))
+
+# per loop: the variable and ghost names, how many of them are
+# variables, and one row per distinct recorded state
+Samples = Tuple[Tuple[str, ...], int, np.ndarray]
+
+def loop_heads(stmt: Stmt, inputs: List[State], fuel: Optional[int] = 1000) -> Dict[Stmt, Samples]:
+    """The states at every loop head of `stmt` when run on `inputs`."""
+    initial = stack_states(inputs)
+    run = _Recorder({name: values.copy() for name, values in initial.items()}, len(inputs), fuel)
+    run.run(stmt, np.ones(len(inputs), dtype=bool))
+
+    heads = {}
+    for loop, records in run.heads.items():
+        # variables assigned on the way to the loop on every path
+        names = sorted(set.intersection(*(set(snapshot) for _, snapshot in records)))
+        lanes = np.concatenate([index for index, _ in records])
+        columns = [np.concatenate([snapshot[name] for _, snapshot in records]) for name in names]
+        columns += [initial[name][lanes] for name in sorted(initial)]
+        data = np.unique(np.stack(columns, axis=1), axis=0) if columns else np.zeros((1, 0), dtype=np.int64)
+        ghosts = tuple(GHOST.format(name) for name in sorted(initial))
+        heads[loop] = (tuple(names) + ghosts, len(names), data)
+    return heads
+
+# Candidates
+# ==========
+
+def equalities(samples: Samples, max_terms: int = 4) -> List[Candidate]:
+    names, variables, data = samples
+    base = range(len(names))
+    factors = [(i,) for i in base] + list(itertools.combinations_with_replacement(base, 2))
+    values = np.stack([np.prod(data[:, list(f)], axis=1) for f in factors], axis=1)
+    involves_variable = np.array([any(i < variables for i in f) for f in factors])
+
+    probe = values[np.random.default_rng(0).permutation(len(values))[:PROBE_ROWS]]
+    found = []
+    for k in range(1, max_terms + 1):
+        combos = np.array([c for c in itertools.combinations(range(len(factors)), k)
+                           if involves_variable[list(c)].any()])
+        coeffs = np.array([c for c in itertools.product(COEFFS, repeat=k) if c[0] > 0 and gcd(*c) == 1])
+        if not len(combos):
+            continue
+        step = max(1, CHUNK // (len(probe) * len(coeffs)))
+        for start in range(0, len(combos), step):
+            block = combos[start:start + step]
+            # residual of every (combo, coefficients) pair on every probe row
+            residuals = np.einsum("pmk,ck->pmc", probe[:, block], coeffs)
+            constant = (residuals == residuals[:1]).all(axis=0)
+            for m, c in zip(*np.nonzero(constant)):
+                full = values[:, block[m]] @ coeffs[c]
+                if (full == full[0]).all():
+                    terms = tuple((int(coeff), tuple(names[i] for i in factors[t]))
+                                  for coeff, t in zip(coeffs[c], block[m]))
+                    found.append(Candidate(terms, "==", int(full[0])))
+    return found
+
+def bounds(samples: Samples) -> List[Candidate]:
+    names, variables, data = samples
+    found = []
+    for i in range(variables):
+        column = data[:, i]
+        found.append(Candidate(((1, (names[i],)),), ">=", int(column.min())))
+        found.append(Candidate(((1, (names[i],)),), "<=", int(column.max())))
+    below = (data[:, :, None] <= data[:, None, :]).all(axis=0)
+    for i, j in zip(*np.nonzero(below)):
+        # v <= w both ways is an equality, found above
+        if i != j and min(i, j) < variables and not below[j, i]:
+            found.append(Candidate(((1, (names[i],)), (-1, (names[j],))), "<=", 0))
+    return found
+
+def _common_factor(candidate: Candidate) -> Optional[Candidate]:
+    # n * m - n * m0 == 0 is m - m0 == 0 times n
+    if candidate.const != 0:
+        return None
+    shared = set.intersection(*(set(factors) for _, factors in candidate.terms))
+    if not shared:
+        return None
+    name = min(shared)
+    return Candidate(tuple((c, tuple(sorted(f[:f.index(name)] + f[f.index(name) + 1:])))
+                           for c, f in candidate.terms), "==", 0)
+
+def _independent(candidates: List[Candidate]) -> List[Candidate]:
+    # drops equalities that follow linearly from better ranked ones, or
+    # are one of those times a variable
+    monomials = sorted({factors for c in candidates for _, factors in c.terms})
+    position = {m: i for i, m in enumerate(monomials + [()])}
+
+    def row(candidate: Candidate) -> np.ndarray:
+        out = np.zeros(len(position) + 1)
+        for coeff, factors in candidate.terms:
+            out[position[factors]] = coeff
+        out[-1] = candidate.const
+        return out
+
+    def follows(r: np.ndarray) -> bool:
+        return np.linalg.matrix_rank(np.array(rows + [r])) == len(rows)
+
+    kept, rows = [], []
+    for candidate in candidates:
+        if candidate.kind != "equality":
+            kept.append(candidate)
+            continue
+        reduced = _common_factor(candidate)
+        if reduced is not None and rows and all(f in position for _, f in reduced.terms) \
+                and follows(row(reduced)):
+            continue
+        r = row(candidate)
+        if not rows or not follows(r):
+            rows.append(r)
+            kept.append(candidate)
+    return kept
+
+def candidates(samples: Samples, max_terms: int = 4) -> List[Candidate]:
+    """Every candidate that holds on all `samples`, best first."""
+    found = sorted(equalities(samples, max_terms) + bounds(samples), key=Candidate.rank)
+    return _independent(found)
+
+# Houdini
+# =======
+
+def _loop_parts(loop: Stmt) -> Tuple[Condition, Stmt]:
+    none = lambda *args: None
+    return loop.match(skip=none, assign=none, seq=none, if_then_else=none, while_do=lambda b, s: (b, s))
+
+def _preserved(pre: Condition, body: Stmt, I: Condition, invariants: Invariants) -> bool:
+    (wp, _, _), obligations = vcgen(body, I, invariants)
+    if not check_implies(pre, wp):
+        return False
+    for ob in obligations:
+        check = check_equal if ob.kind == "equal" else check_implies
+        if not check(ob.P1, ob.P2):
+            return False
+    return True
+
+def _established(stmt: Stmt, loop: Stmt, P: Condition, I: Condition, invariants: Invariants) -> bool:
+    # P ⇒ wp of the statements before `loop`, if it is reached from the
+    # top of `stmt`; other loops are assumed to have invariant True
+    assumed = {**{other: TRUE for other in loops(stmt)}, **invariants, loop: I}
+    _, obligations = vcgen(stmt, TRUE, assumed, P)
+    return all(check_implies(ob.P1, ob.P2) for ob in obligations if ob.rule == "precondition")
+
+def houdini(loop: Stmt, found: List[Candidate], ghosts: Dict[str, int],
+            invariants: Invariants) -> List[Candidate]:
+    """The largest subset of `found` whose conjunction the loop body preserves."""
+    B, body = _loop_parts(loop)
+    alive = list(found)
+    while True:
+        pre = Conj(conjoin(alive, ghosts), B)
+        kept = [c for c in alive if _preserved(pre, body, c.condition(ghosts), invariants)]
+        if len(kept) == len(alive):
+            return alive
+        alive = kept
+
+def mine(stmt: Stmt, inputs: List[State], ghosts: Optional[Dict[str, int]] = None,
+         P: Optional[Condition] = None, fuel: Optional[int] = 1000,
+         max_terms: int = 4) -> Dict[Stmt, List[Candidate]]:
+    """
+    The ranked, inductive invariant candidates of every loop in `stmt`,
+    mined from runs on `inputs`. `ghosts` binds the ghost variables for
+    the inductiveness check, by default to the first input. With a
+    precondition `P`, candidates it does not establish are dropped too.
+    """
+    if ghosts is None:
+        ghosts = {GHOST.format(name): value for name, value in inputs[0].items()}
+    heads = loop_heads(stmt, inputs, fuel)
+
+    mined: Dict[Stmt, List[Candidate]] = {}
+    invariants: Invariants = {}
+    # inner loops first: checking an outer loop's body needs their invariants
+    for loop in reversed(loops(stmt)):
+        found = candidates(heads[loop], max_terms) if loop in heads else []
+        if P is not None:
+            found = [c for c in found if _established(stmt, loop, P, c.condition(ghosts), invariants)]
+        mined[loop] = houdini(loop, found, ghosts, invariants)
+        invariants[loop] = conjoin(mined[loop], ghosts)
+    return {loop: mined[loop] for loop in loops(stmt)}
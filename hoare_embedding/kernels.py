@@ -0,0 +1,143 @@
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from domain import Domain, reads
+from memo import LRUCache, condition_key
+from symbolic import Sym, SymState, Untraceable, free_vars, trace
+
+# NumPy kernels
+# =============
+# Turns a condition or expression lambda into a function that evaluates
+# it over whole arrays at once. The lambda is traced once (symbolic.py)
+# into an expression graph, and the graph is emitted as straight-line
+# NumPy code, one temporary per node.
+#
+# Branches the tracer can join (`and`/`or`/`not`/`if` over a few paths)
+# become `np.where`. Both sides are evaluated on every lane, so errors
+# on lanes a branch would have skipped (e.g. division by zero) are
+# silenced. Lambdas that cannot be traced get no kernel, and callers
+# evaluate them state by state instead.
+#
+# Arithmetic is int64 and wraps on overflow, unlike Python ints.
+
+# kernels may only branch over this many paths
+MAX_PATHS = 16
+
+Columns = Mapping[str, np.ndarray]
+Kernel = Callable[[Columns], np.ndarray]
+
+_NUMPY_OPS = {
+    "+": "({} + {})",
+    "-": "({} - {})",
+    "*": "({} * {})",
+    "//": "np.floor_divide({}, {})",
+    "%": "np.mod({}, {})",
+    "==": "({} == {})",
+    "!=": "({} != {})",
+    "<": "({} < {})",
+    "<=": "({} <= {})",
+    ">": "({} > {})",
+    ">=": "({} >= {})",
+}
+
+def emit(e: Sym) -> Tuple[str, List[Any]]:
+    """
+    Source of `def kernel(cols, k)` computing `e`, and the constants to
+    pass as `k`.
+    """
+    lines: List[str] = []
+    names: Dict[int, str] = {}
+    # the tracer re-runs the lambda per path, so the same subexpression
+    # shows up as several nodes; emit each distinct expression once
+    temps: Dict[str, str] = {}
+    consts: List[Any] = []
+
+    def go(node: Sym) -> str:
+        done = names.get(id(node))
+        if done is not None:
+            return done
+        op = node.op
+        if op == "var":
+            expr = f"cols[{node.args[0]!r}]"
+        elif op == "const":
+            value = node.args[0]
+            if isinstance(value, (bool, int)):
+                expr = repr(value)
+            else:
+                consts.append(value)
+                expr = f"k[{len(consts) - 1}]"
+        elif op == "neg":
+            expr = f"(-{go(node.args[0])})"
+        elif op == "ite":
+            c, t, f = (go(arg) for arg in node.args)
+            expr = f"np.where({c}, {t}, {f})"
+        else:
+            expr = _NUMPY_OPS[op].format(go(node.args[0]), go(node.args[1]))
+        name = temps.get(expr)
+        if name is None:
+            name = temps[expr] = f"t{len(temps)}"
+            lines.append(f"    {name} = {expr}")
+        names[id(node)] = name
+        return name
+
+    result = go(e)
+    source = "def kernel(cols, k):\n" + "\n".join(lines) + f"\n    return {result}\n"
+    return source, consts
+
+def compile_kernel(e: Sym) -> Kernel:
+    source, consts = emit(e)
+    namespace: Dict[str, Any] = {"np": np}
+    exec(compile(source, "<kernel>", "exec"), namespace)
+    kernel = namespace["kernel"]
+
+    def run(cols: Columns) -> np.ndarray:
+        with np.errstate(all="ignore"):
+            return kernel(cols, consts)
+    run.source = source
+    # the variables it reads on any path, which can be more than the
+    # condition reads on a given domain
+    run.names = frozenset(free_vars(e))
+    return run
+
+_kernels = LRUCache(maxsize=4096)
+
+def kernel_for(f: Callable[[Any], Any]) -> Optional[Kernel]:
+    """The kernel for `f`, or None if `f` cannot be traced."""
+    key = condition_key(f)
+    entry = _kernels.get(key)
+    if entry is not None:
+        return entry[0]
+    try:
+        # claim every variable f reads, so `subst` copies carry them
+        kernel = compile_kernel(trace(f, SymState(sorted(reads(f))), max_paths=MAX_PATHS))
+    except Untraceable:
+        kernel = None
+    # keep f alive so identity-based parts of its key stay valid
+    _kernels.put(key, (kernel, f))
+    return kernel
+
+def evaluate_over(f: Callable[[Any], Any], cols: Columns, lanes: int) -> np.ndarray:
+    """
+    Evaluates `f` on every lane of `cols`, with its kernel if it has one
+    and `cols` has every variable the kernel reads, and state by state
+    otherwise.
+    """
+    kernel = kernel_for(f)
+    if kernel is not None and kernel.names <= cols.keys():
+        return np.broadcast_to(kernel(cols), (lanes,))
+    names = list(cols)
+    return np.array([
+        f({name: cols[name][i].item() for name in names}) for i in range(lanes)
+    ])
+
+_columns = LRUCache(maxsize=64)
+
+def domain_columns(domain: Domain) -> Dict[str, np.ndarray]:
+    """One array per variable, lane i holding `domain.states[i]`."""
+    cols = _columns.get(domain.key)
+    if cols is None:
+        grids = np.meshgrid(*(np.array(r, dtype=np.int64) for r in domain.ranges), indexing="ij")
+        cols = {name: grid.ravel() for name, grid in zip(domain.names, grids)}
+        _columns.put(domain.key, cols)
+    return cols
@@ -0,0 +1,172 @@
+import types
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable, Iterator, Optional, Tuple
+
+# Memoization helpers
+# ===================
+
+class LRUCache:
+    """
+    Bounded mapping that evicts the least recently used entry once it
+    holds `maxsize` entries, and counts hits, misses and evictions.
+    Entries can carry the cost of computing them; `saved_s` adds up the
+    cost of every hit.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self.maxsize = maxsize
+        self.entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_s = 0.0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            value, cost = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        self.saved_s += cost
+        return value
+
+    def put(self, key: Hashable, value: Any, cost: float = 0.0) -> None:
+        self.entries[key] = (value, cost)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+        self.saved_s = 0.0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_s": self.saved_s,
+        }
+
+# Condition keys
+# ==============
+# Conditions are compared by identity, except for plain Python functions:
+# those are keyed on their code (minus line numbers), defaults, and the
+# (recursively keyed) values they close over and the globals they read.
+# Two `lambda s: I(s) and B(s)` built by the same rule for the same I and
+# B then get the same key, and rebinding a global a condition reads (say
+# K = 1 to K = 5) gives it a new key, so no cached result carries over.
+#
+# Conditions are assumed to be pure functions of the state and of those
+# values. Objects other than numbers, strings, tuples and functions are
+# keyed by identity, so mutating one in place is not noticed.
+
+MAX_KEY_DEPTH = 8
+
+# condition keys by (id, depth) inside `key_scope`, with the condition
+# kept alive so its id is not reused
+_scope: Optional[Dict[Tuple[int, int], Tuple[Hashable, Any]]] = None
+
+@contextmanager
+def key_scope() -> Iterator[None]:
+    """
+    Computes each condition's key once until the block ends. Keys read
+    global values, so this is only for work that does not rebind them
+    meanwhile, such as a single check.
+    """
+    global _scope
+    if _scope is not None:
+        yield
+        return
+    _scope = {}
+    try:
+        yield
+    finally:
+        _scope = None
+
+def condition_key(P: Any, depth: int = 0) -> Hashable:
+    if _scope is None:
+        return _condition_key(P, depth)
+    entry = _scope.get((id(P), depth))
+    if entry is None:
+        entry = _scope[(id(P), depth)] = (_condition_key(P, depth), P)
+    return entry[0]
+
+def _condition_key(P: Any, depth: int) -> Hashable:
+    if isinstance(P, types.FunctionType) and depth < MAX_KEY_DEPTH:
+        closure = P.__closure__ or ()
+        return (
+            "fn",
+            _code_key(P.__code__),
+            _value_key(P.__defaults__, depth),
+            tuple(_value_key(_cell_contents(cell), depth) for cell in closure),
+            _globals_key(P, depth),
+        )
+    key = getattr(P, "key", None)
+    if key is not None and not callable(key):
+        # introspectable condition objects expose their own structural key
+        return key
+    return ("id", id(P))
+
+_code_keys: "weakref.WeakKeyDictionary[types.CodeType, types.CodeType]" = weakref.WeakKeyDictionary()
+
+def _code_key(code: types.CodeType) -> types.CodeType:
+    # the code without its line numbers, so moving a lambda around in
+    # its file (e.g. by editing the proof above it) keeps its key
+    key = _code_keys.get(code)
+    if key is None:
+        consts = tuple(_code_key(c) if isinstance(c, types.CodeType) else c for c in code.co_consts)
+        key = _code_keys[code] = code.replace(co_firstlineno=1, co_linetable=b"", co_consts=consts)
+    return key
+
+_global_names: "weakref.WeakKeyDictionary[types.CodeType, Tuple[str, ...]]" = weakref.WeakKeyDictionary()
+
+def _names(code: types.CodeType) -> Tuple[str, ...]:
+    # every name `code` and the code nested in it may look up globally
+    # (co_names also holds attribute names; those are simply not found)
+    names = _global_names.get(code)
+    if names is None:
+        found = set(code.co_names)
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                found.update(_names(const))
+        names = _global_names[code] = tuple(sorted(found))
+    return names
+
+def _globals_key(P: types.FunctionType, depth: int) -> Hashable:
+    namespace = P.__globals__
+    # names not defined here are builtins or attributes; defining one
+    # later still changes the key
+    return tuple((name, _value_key(namespace[name], depth))
+                 for name in _names(P.__code__) if name in namespace)
+
+def _cell_contents(cell: Any) -> Any:
+    try:
+        return cell.cell_contents
+    except ValueError:
+        # empty cell
+        return _EMPTY
+
+_EMPTY = object()
+
+def _value_key(value: Any, depth: int) -> Hashable:
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return (type(value).__name__, value)
+    if isinstance(value, tuple):
+        return ("tuple",) + tuple(_value_key(v, depth + 1) for v in value)
+    if callable(value) and not isinstance(value, type):
+        return condition_key(value, depth + 1)
+    return ("id", id(value))
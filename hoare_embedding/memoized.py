@@ -0,0 +1,76 @@
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Tuple
+
+from compiler import Compiled, _compile
+from hoare import State, Stmt
+from memo import LRUCache
+
+# Memoized evaluation
+# ===================
+# Sweeping a program over a grid of inputs runs the same loops from
+# many states that lead to the same place: COUNT_UP from (x=5, y=0)
+# passes (5, 1), (5, 2), ..., all of which are inputs of their own. The
+# evaluator here remembers, per WHILE_DO, the exit state for every
+# state seen at its head, so later runs stop as soon as they reach a
+# known one.
+#
+# Cache keys are frozen states (sorted tuples of items). Every head
+# state of a run is stored, up to the size of the cache; each loop has
+# its own LRU cache, and `stats()` reports them per loop.
+#
+#     run = Memoized(COUNT_UP)
+#     for x in range(100):
+#         for y in range(x + 1):
+#             run({"x": x, "y": y})
+#     run.stats()
+
+FrozenState = Tuple[Tuple[str, Any], ...]
+
+def freeze(state: State) -> FrozenState:
+    return tuple(sorted(state.items()))
+
+class Memoized:
+    def __init__(self, stmt: Stmt, maxsize: int = 100000) -> None:
+        self.maxsize = maxsize
+        # one per loop, in the order `vcgen.loops` lists them
+        self.caches: List[LRUCache] = []
+        self.run = _compile(stmt, self._compile_while)
+
+    def __call__(self, state: State) -> State:
+        return self.run(state)
+
+    def _compile_while(self, b: Callable[[State], bool], s: Stmt,
+                       compile_while: Callable[..., Compiled]) -> Compiled:
+        cache = LRUCache(self.maxsize)
+        self.caches.append(cache)
+        body = _compile(s, compile_while)
+        maxsize = self.maxsize
+
+        def run(state: State) -> State:
+            # head states of this run that the cache does not know yet;
+            # more than the cache holds would only be evicted again
+            seen: Deque[FrozenState] = deque(maxlen=maxsize)
+            while True:
+                key = freeze(state)
+                final = cache.get(key)
+                if final is not None:
+                    break
+                seen.append(key)
+                if not b(state):
+                    # a copy: `state` may be the caller's own dict (no
+                    # iterations, or a body that returns its input)
+                    final = dict(state)
+                    break
+                state = body(state)
+            for key in seen:
+                cache.put(key, final)
+            # callers may change the state they get
+            return dict(final)
+        return run
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [{"loop": i, **cache.stats()} for i, cache in enumerate(self.caches)]
+
+    def clear(self) -> None:
+        for cache in self.caches:
+            cache.clear()
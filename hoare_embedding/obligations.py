@@ -0,0 +1,111 @@
+import sys
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional
+
+import hoare
+from domain import domain_for
+from hoare import Backend, CheckResult, Condition, State
+from truth_table import bitset_backend
+
+# Deferred side conditions
+# ========================
+# Normally every rule checks its side conditions on the spot, so a proof
+# stops at the first one that fails. Under `deferred()` the rules only
+# record them, and `discharge()` checks them all at the end and reports
+# every failure together with the rule and proof line it came from. A
+# condition that raises while it is checked (e.g. a recursion that does
+# not stop outside its intended inputs) is a failure of its obligation
+# too, reported with the exception, and the other obligations are still
+# checked.
+#
+#     with deferred() as ctx:
+#         triple = proof(3, 4)
+#     report = ctx.discharge()
+#     print(report)
+#
+# By default everything is discharged with bitset truth tables
+# (truth_table.py): obligations over the same variables share one
+# domain, and each condition is evaluated once per domain however many
+# obligations mention it.
+
+KINDS = {"check_equal": "equal", "check_implies": "implies"}
+
+@dataclass
+class Obligation:
+    kind: str
+    P1: Condition
+    P2: Condition
+    rule: str
+    # file:line of the proof step that applied the rule
+    where: str
+
+    def __str__(self) -> str:
+        return f"{self.rule} ({self.kind}) at {self.where}"
+
+@dataclass
+class Failure:
+    obligation: Obligation
+    counterexample: Optional[State]
+    # what checking the obligation raised, if it did not finish
+    error: Optional[Exception] = None
+
+    def __str__(self) -> str:
+        if self.error is not None:
+            return f"{self.obligation} raised {type(self.error).__name__}: {self.error}"
+        return f"{self.obligation} fails at {self.counterexample}"
+
+@dataclass
+class Report:
+    checked: int
+    failures: List[Failure]
+
+    def __bool__(self) -> bool:
+        return not self.failures
+
+    def __str__(self) -> str:
+        lines = [f"{self.checked} side conditions, {len(self.failures)} failing"]
+        lines += [f"  {failure}" for failure in self.failures]
+        return "\n".join(lines)
+
+class ProofContext:
+    def __init__(self) -> None:
+        self.obligations: List[Obligation] = []
+
+    def record(self, check: Callable[[Condition, Condition], CheckResult], P1: Condition, P2: Condition) -> None:
+        # called from `require`, which is called from the rule
+        rule = sys._getframe(2)
+        step = rule.f_back
+        where = f"{step.f_code.co_filename}:{step.f_lineno}" if step is not None else "?"
+        self.obligations.append(Obligation(KINDS[check.__name__], P1, P2, rule.f_code.co_name, where))
+
+    def discharge(self, backend: Backend = bitset_backend) -> Report:
+        failures = []
+        for ob in self.obligations:
+            if ob.P1 is ob.P2:
+                continue
+            try:
+                result = backend(ob.kind, ob.P1, ob.P2, domain_for(ob.P1, ob.P2))
+            except Exception as e:
+                failures.append(Failure(ob, None, e))
+                continue
+            if not result:
+                failures.append(Failure(ob, result.counterexample))
+        return Report(len(self.obligations), failures)
+
+@contextmanager
+def deferred() -> Iterator[ProofContext]:
+    """Records the side conditions of the rules applied inside."""
+    ctx = ProofContext()
+    outer = hoare.DEFER
+    hoare.DEFER = ctx.record
+    try:
+        yield ctx
+    finally:
+        hoare.DEFER = outer
+
+def check_proof(proof: Callable[..., object], *args: object) -> Report:
+    """Runs `proof(*args)` with deferred side conditions and discharges them."""
+    with deferred() as ctx:
+        proof(*args)
+    return ctx.discharge()
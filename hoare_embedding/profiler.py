@@ -0,0 +1,192 @@
+import json
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterator, List
+
+import hoare
+from hoare import CheckResult, Condition, State, Stmt
+
+# Profiling
+# =========
+# Where does the time go in a slow sweep or proof? A Profile counts
+# executions and adds up wall time in three tables:
+#
+#   nodes    per Stmt node, named by its path in the program ("S.2.body.1
+#            assign r"); only `evaluate_profiled` fills this one
+#   lambdas  per guard and assigned expression, named by its node and by
+#            where the lambda is defined
+#   checks   per check_equal/check_implies call site, named by the rule
+#            (or other function) that asked for it and the proof line
+#            that applied the rule
+#
+# Nested timings are also kept as stacks, e.g.
+# "S;S.2 while;S.2 guard", with the time spent in each stack itself
+# (not in deeper frames), for flame graph tools.
+#
+#     profile = Profile()
+#     evaluate_profiled(MUL, {"n": 100, "m": 7}, profile)
+#     run = compile_stmt(instrument(MUL, profile))   # any engine
+#     with profiling(profile):
+#         proof(3, 4)
+#     profile.write_json("mul.json")
+#     profile.write_collapsed("mul.folded")   # flamegraph.pl mul.folded
+
+@dataclass
+class Stat:
+    count: int = 0
+    total_s: float = 0.0
+
+class Profile:
+    def __init__(self) -> None:
+        self.nodes: Dict[str, Stat] = {}
+        self.lambdas: Dict[str, Stat] = {}
+        self.checks: Dict[str, Stat] = {}
+        # collapsed stack -> seconds spent in its top frame
+        self.stacks: Dict[str, float] = {}
+        self._frames: List[str] = []
+        # per open frame, the time spent in frames it called
+        self._children: List[float] = []
+
+    @contextmanager
+    def frame(self, table: Dict[str, Stat], name: str) -> Iterator[None]:
+        self._frames.append(name)
+        self._children.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stack = ";".join(self._frames)
+            self._frames.pop()
+            own = elapsed - self._children.pop()
+            if self._children:
+                self._children[-1] += elapsed
+            self.add(table, name, elapsed)
+            self.stacks[stack] = self.stacks.get(stack, 0.0) + own
+
+    def add(self, table: Dict[str, Stat], name: str, elapsed: float) -> None:
+        stat = table.get(name)
+        if stat is None:
+            stat = table[name] = Stat()
+        stat.count += 1
+        stat.total_s += elapsed
+
+    def call(self, f: Callable[[State], Any], name: str, state: State) -> Any:
+        with self.frame(self.lambdas, name):
+            return f(state)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            table: {name: asdict(stat) for name, stat in sorted(stats.items(), key=lambda kv: -kv[1].total_s)}
+            for table, stats in [("nodes", self.nodes), ("lambdas", self.lambdas), ("checks", self.checks)]
+        }
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_json(), f, indent=2)
+
+    def collapsed(self) -> str:
+        # "frame;frame;frame microseconds", the input format of flamegraph.pl
+        return "".join(
+            f"{stack} {round(seconds * 1e6)}\n"
+            for stack, seconds in sorted(self.stacks.items()) if seconds > 0
+        )
+
+    def write_collapsed(self, path: str) -> None:
+        with open(path, "w") as f:
+            f.write(self.collapsed())
+
+def _where(f: Callable[..., Any]) -> str:
+    code = getattr(f, "__code__", None)
+    return f"{code.co_filename}:{code.co_firstlineno}" if code is not None else repr(f)
+
+# Programs
+# ========
+
+def evaluate_profiled(stmt: Stmt, state: State, profile: Profile, path: str = "S") -> State:
+    """`evaluate`, timing every node and lambda into `profile`."""
+    def skip() -> State:
+        with profile.frame(profile.nodes, f"{path} skip"):
+            return state
+
+    def assign(x: str, a: Callable[[State], int]) -> State:
+        with profile.frame(profile.nodes, f"{path} assign {x}"):
+            return {**state, x: profile.call(a, f"{path} {x} := ({_where(a)})", state)}
+
+    def seq(s1: Stmt, s2: Stmt) -> State:
+        with profile.frame(profile.nodes, f"{path} seq"):
+            middle = evaluate_profiled(s1, state, profile, f"{path}.1")
+            return evaluate_profiled(s2, middle, profile, f"{path}.2")
+
+    def if_then_else(b: Callable[[State], bool], s1: Stmt, s2: Stmt) -> State:
+        with profile.frame(profile.nodes, f"{path} if"):
+            if profile.call(b, f"{path} guard ({_where(b)})", state):
+                return evaluate_profiled(s1, state, profile, f"{path}.then")
+            return evaluate_profiled(s2, state, profile, f"{path}.else")
+
+    def while_do(b: Callable[[State], bool], s: Stmt) -> State:
+        # iterations in a loop rather than recursion, so long loops fit
+        current = state
+        with profile.frame(profile.nodes, f"{path} while"):
+            while profile.call(b, f"{path} guard ({_where(b)})", current):
+                current = evaluate_profiled(s, current, profile, f"{path}.body")
+        return current
+
+    return stmt.match(skip=skip, assign=assign, seq=seq, if_then_else=if_then_else, while_do=while_do)
+
+def instrument(stmt: Stmt, profile: Profile, path: str = "S") -> Stmt:
+    """
+    A copy of `stmt` whose guards and expressions time themselves into
+    `profile.lambdas`. Runs on every engine that calls the lambdas with
+    one state at a time (evaluate, compile_stmt, evaluate_iterative,
+    Memoized, ...).
+    """
+    def timed(f: Callable[[State], Any], name: str) -> Callable[[State], Any]:
+        return lambda s: profile.call(f, name, s)
+
+    return stmt.match(
+        skip=lambda: Stmt.SKIP(),
+        assign=lambda x, a: Stmt.ASSIGN(x, timed(a, f"{path} {x} := ({_where(a)})")),
+        seq=lambda s1, s2: Stmt.SEQ(instrument(s1, profile, f"{path}.1"), instrument(s2, profile, f"{path}.2")),
+        if_then_else=lambda b, s1, s2: Stmt.IF_THEN_ELSE(
+            timed(b, f"{path} guard ({_where(b)})"),
+            instrument(s1, profile, f"{path}.then"),
+            instrument(s2, profile, f"{path}.else"),
+        ),
+        while_do=lambda b, s: Stmt.WHILE_DO(
+            timed(b, f"{path} guard ({_where(b)})"),
+            instrument(s, profile, f"{path}.body"),
+        ),
+    )
+
+# Proofs
+# ======
+
+# frames between the observer and whoever asked for the check
+_CHECK_FRAMES = {"_observed_check", "check_equal", "check_implies", "require"}
+
+@contextmanager
+def profiling(profile: Profile) -> Iterator[Profile]:
+    """Times every check_equal/check_implies made inside into `profile.checks`."""
+    def observe(kind: str, P1: Condition, P2: Condition, result: CheckResult, elapsed: float) -> None:
+        frame = sys._getframe(2)
+        while frame is not None and frame.f_code.co_name in _CHECK_FRAMES:
+            frame = frame.f_back
+        if frame is None:
+            return
+        caller = frame.f_code.co_name
+        step = frame.f_back
+        where = f"{step.f_code.co_filename}:{step.f_lineno}" if step is not None else "?"
+        name = f"{caller} at {where}"
+        profile.add(profile.checks, name, elapsed)
+        stack = ";".join(profile._frames + [name, f"check_{kind}"])
+        profile.stacks[stack] = profile.stacks.get(stack, 0.0) + elapsed
+
+    outer = hoare.OBSERVE
+    hoare.OBSERVE = observe
+    try:
+        yield profile
+    finally:
+        hoare.OBSERVE = outer
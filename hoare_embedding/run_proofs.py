@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+
+import argparse
+import builtins
+import dis
+import hashlib
+import importlib.util
+import inspect
+import itertools
+import json
+import marshal
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import types
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from corpus import TestCase, load_test, program_names, read_sections
+from domain import domain_for
+from hoare import HoareTriple, State, Stmt, check_equal, check_implies
+
+# Proof runner
+# ============
+# Checks every `results/<NAME>_proof` against `programs/<NAME>.test`, for
+# every point of a parameter grid, in a process pool:
+#
+#     python run_proofs.py --grid 0:4 --jobs 8 --timeout 10 --out matrix.jsonl
+#
+# The grid covers the proof's arguments (e.g. a, b) and the free names
+# the program needs (e.g. N in GAUSS). A run passes if the proof returns
+# a triple {P'} S {Q'} where S is the test's program (lambdas compared
+# as conditions, see `same_program`), P ⇒ P' and Q' ⇒ Q. It fails if
+# a rule's side condition or that final check does not hold, and times
+# out after `--timeout` seconds. Every run is one JSON line.
+#
+# Proofs are compiled once and the code objects kept in
+# `results/__pycache__`, keyed on the source, across runs.
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+CACHE_DIR = os.path.join(RESULTS_DIR, "__pycache__")
+
+class ProofTimeout(Exception):
+    pass
+
+# Proof code
+# ==========
+
+def proof_path(name: str) -> str:
+    return os.path.join(RESULTS_DIR, f"{name}_proof")
+
+def proof_code(path: str) -> types.CodeType:
+    with open(path, "rb") as f:
+        source = f.read()
+    # the code object records the path it was compiled from, and marshal
+    # data only loads on the Python version that wrote it
+    path = os.path.abspath(path)
+    key = importlib.util.MAGIC_NUMBER + path.encode() + b"\0" + source
+    digest = hashlib.sha1(key).hexdigest()[:16]
+    cached = os.path.join(CACHE_DIR, f"{os.path.basename(path)}.{digest}.marshal")
+    try:
+        with open(cached, "rb") as f:
+            return marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    code = compile(source, path, "exec")
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # write then rename, so parallel runs never read half a file
+    tmp = f"{cached}.{os.getpid()}"
+    with open(tmp, "wb") as f:
+        marshal.dump(code, f)
+    os.replace(tmp, cached)
+    return code
+
+def proof_function(namespace: Dict[str, Any], path: str) -> types.FunctionType:
+    # `proof`, or else the last `*_proof` the file defines (e.g.
+    # `count_up_proof`); the namespace also holds hoare.py's examples
+    path = os.path.abspath(path)
+    defined = [f for f in namespace.values()
+               if isinstance(f, types.FunctionType) and f.__code__.co_filename == path
+               and f.__name__.endswith("proof")]
+    for f in defined:
+        if f.__name__ == "proof":
+            return f
+    if not defined:
+        raise LookupError(f"{path} defines no proof function")
+    return defined[-1]
+
+def free_names(name: str) -> List[str]:
+    """Names the program and its pre/postcondition use but do not define."""
+    program, _, _, prepost = read_sections(name)
+    defined = set(load_test_names(name))
+    found: Set[str] = set()
+
+    def visit(code: types.CodeType) -> None:
+        found.update(i.argval for i in dis.get_instructions(code)
+                     if i.opname in ("LOAD_GLOBAL", "LOAD_NAME"))
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                visit(const)
+    for section in (program, prepost):
+        visit(compile(section, name, "exec"))
+    return sorted(n for n in found - defined if not hasattr(builtins, n))
+
+def load_test_names(name: str) -> List[str]:
+    # everything defined once the test is loaded; free names are looked
+    # up late, so loading works without them
+    return list(load_test(name).namespace)
+
+# Checking
+# ========
+
+def _parts(stmt: Stmt) -> Tuple[str, Tuple[Any, ...]]:
+    return stmt.match(
+        skip=lambda: ("skip", ()),
+        assign=lambda x, a: ("assign", (x, a)),
+        seq=lambda s1, s2: ("seq", (s1, s2)),
+        if_then_else=lambda b, s1, s2: ("if", (b, s1, s2)),
+        while_do=lambda b, s: ("while", (b, s)),
+    )
+
+def _value(a: Callable[[State], Any], s: State) -> Any:
+    try:
+        return a(s)
+    except Exception as e:
+        return type(e)
+
+def same_expression(a: Callable[[State], Any], b: Callable[[State], Any]) -> bool:
+    # by value: check_equal compares truth values, and `r + m` and
+    # `r + 2 * m` are both true wherever they are nonzero
+    return all(_value(a, s) == _value(b, s) for s in domain_for(a, b).states)
+
+def same_program(S: Stmt, T: Stmt) -> bool:
+    """Same shape, and every pair of lambdas agrees on every state."""
+    kind1, args1 = _parts(S)
+    kind2, args2 = _parts(T)
+    if kind1 != kind2:
+        return False
+    for x, y in zip(args1, args2):
+        if isinstance(x, str):
+            same = x == y
+        elif isinstance(x, Stmt):
+            same = same_program(x, y)
+        elif kind1 == "assign":
+            same = same_expression(x, y)
+        else:
+            same = bool(check_equal(x, y))
+        if not same:
+            return False
+    return True
+
+def check_triple(triple: HoareTriple, test: TestCase) -> Optional[str]:
+    """Why `triple` does not prove the test's triple, or None if it does."""
+    P, S, Q = triple
+    if not same_program(S, test.program):
+        return "the proof is about a different program"
+    pre = check_implies(test.P, P)
+    if not pre:
+        return f"P does not imply the proof's precondition at {pre.counterexample}"
+    post = check_implies(Q, test.Q)
+    if not post:
+        return f"the proof's postcondition does not imply Q at {post.counterexample}"
+    return None
+
+Task = Tuple[str, Dict[str, int], float]
+
+def _on_alarm(signum: int, frame: Any) -> None:
+    raise ProofTimeout()
+
+def run_task(task: Task) -> Dict[str, Any]:
+    name, params, timeout = task
+    path = proof_path(name)
+    row: Dict[str, Any] = {"program": name, "params": params}
+    start = time.perf_counter()
+    signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        test = load_test(name, **params)
+        namespace = test.namespace
+        exec(proof_code(path), namespace)
+        proof = proof_function(namespace, path)
+        args = [params[p] for p in inspect.signature(proof).parameters]
+        reason = check_triple(proof(*args), test)
+        row["status"] = "pass" if reason is None else "fail"
+        if reason is not None:
+            row["message"] = reason
+    except ProofTimeout:
+        row["status"] = "timeout"
+    except AssertionError as e:
+        row["status"] = "fail"
+        row["message"] = str(e)
+    except Exception as e:
+        row["status"] = "error"
+        row["message"] = f"{type(e).__name__}: {e}"
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    row["seconds"] = time.perf_counter() - start
+    return row
+
+# Grid
+# ====
+
+def parameters(name: str) -> List[str]:
+    """The proof's arguments, then the program's free names."""
+    test = load_test(name)
+    namespace = test.namespace
+    exec(proof_code(proof_path(name)), namespace)
+    args = list(inspect.signature(proof_function(namespace, proof_path(name))).parameters)
+    return args + [n for n in free_names(name) if n not in args]
+
+def tasks(names: List[str], grid: range, timeout: float) -> Iterator[Task]:
+    for name in names:
+        params = parameters(name)
+        for values in itertools.product(grid, repeat=len(params)):
+            yield (name, dict(zip(params, values)), timeout)
+
+def run(names: List[str], grid: range, jobs: int, timeout: float) -> Iterator[Dict[str, Any]]:
+    work = list(tasks(names, grid, timeout))
+    if jobs <= 1:
+        yield from map(run_task, work)
+        return
+    with multiprocessing.Pool(jobs) as pool:
+        yield from pool.imap_unordered(run_task, work)
+
+def parse_grid(spec: str) -> range:
+    low, _, high = spec.partition(":")
+    return range(int(low), int(high)) if high else range(int(low) + 1)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check results/*_proof over parameter grids.")
+    parser.add_argument("names", nargs="*", help="programs to check (default: all with a proof)")
+    parser.add_argument("--grid", default="0:4", help="parameter values as low:high (default 0:4)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--out", help="JSONL file to write (default: stdout)")
+    args = parser.parse_args(argv)
+
+    names = args.names or [n for n in program_names() if os.path.exists(proof_path(n))]
+    out = open(args.out, "w") if args.out else sys.stdout
+    counts: Dict[str, int] = {}
+    try:
+        for row in run(names, parse_grid(args.grid), args.jobs, args.timeout):
+            counts[row["status"]] = counts.get(row["status"], 0) + 1
+            out.write(json.dumps(row) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(", ".join(f"{n} {status}" for status, n in sorted(counts.items())), file=sys.stderr)
+    return 0 if set(counts) <= {"pass"} else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
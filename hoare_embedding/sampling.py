@@ -0,0 +1,143 @@
+import random
+import time
+from typing import Callable, Dict, List, Optional, Union
+
+from domain import Domain
+from hoare import CheckResult, Condition, State, fails_on
+
+# Sampling backend
+# ================
+# Full enumeration is out of reach beyond three or four variables. This
+# backend instead draws random states, in growing rounds, until the check
+# is confident enough, the sample budget is spent, or the time budget
+# runs out. Each variable is drawn from the range the active domain gives
+# it (see `configure_domain`), unless a distribution is passed for it. A
+# failing state is shrunk towards 0, without leaving those ranges, before
+# it is reported.
+#
+# Every check starts from the same seed, so results are reproducible.
+#
+#     from hoare import set_backend
+#     from sampling import SamplingBackend
+#     set_backend(SamplingBackend(seed=1, time_budget=0.5, n=range(0, 1000)))
+
+Distribution = Callable[[random.Random], int]
+
+def boundary_values(low: int, high: int) -> List[int]:
+    values = [0, 1, -1, low, low + 1, high, high - 1]
+    return [v for v in values if low <= v <= high]
+
+def default_distribution(low: int, high: int) -> Distribution:
+    """
+    Mixes boundary values (0, ±1 and the extremes) and small values with
+    uniform draws from [low, high].
+    """
+    edges = boundary_values(low, high)
+    small_low, small_high = max(low, -10), min(high, 10)
+
+    def draw(rng: random.Random) -> int:
+        p = rng.random()
+        if p < 0.25:
+            return rng.choice(edges)
+        if p < 0.5:
+            return rng.randint(small_low, small_high)
+        return rng.randint(low, high)
+    return draw
+
+def as_distribution(spec: Union[Distribution, range]) -> Distribution:
+    if isinstance(spec, range):
+        return default_distribution(spec.start, spec.stop - 1)
+    return spec
+
+class SamplingBackend:
+    """
+    `epsilon` is the failure rate we want to rule out: once `3 / n <=
+    epsilon` for n passing samples (the "rule of three", 95% confidence)
+    the check passes. `max_samples` and `time_budget` (seconds) bound the
+    work per check. Per-variable distributions are given as keyword
+    arguments, either a range or a function of a `random.Random`; other
+    variables are drawn from their domain range.
+    """
+
+    def __init__(self, seed: int = 0, epsilon: float = 1e-3, max_samples: int = 100000,
+                 time_budget: Optional[float] = 1.0, first_round: int = 64,
+                 **distributions: Union[Distribution, range]) -> None:
+        self.seed = seed
+        self.epsilon = epsilon
+        self.max_samples = max_samples
+        self.time_budget = time_budget
+        self.first_round = first_round
+        self.distributions = distributions
+        # samples drawn over all checks
+        self.samples = 0
+
+    def __call__(self, kind: str, P1: Condition, P2: Condition, domain: Domain) -> CheckResult:
+        fails = fails_on(kind, P1, P2)
+        rng = random.Random(self.seed)
+        specs = [self.distributions.get(name, r) for name, r in zip(domain.names, domain.ranges)]
+        draws = [(name, as_distribution(spec)) for name, spec in zip(domain.names, specs)]
+        # shrinking stays inside the ranges states are drawn from
+        bounds = {name: spec for name, spec in zip(domain.names, specs) if isinstance(spec, range)}
+        target = min(self.max_samples, int(3 / self.epsilon) + 1)
+        deadline = None if self.time_budget is None else time.monotonic() + self.time_budget
+
+        checked = 0
+        batch = self.first_round
+        while checked < target:
+            for _ in range(min(batch, target - checked)):
+                state = {name: draw(rng) for name, draw in draws}
+                checked += 1
+                if fails(state):
+                    self.samples += checked
+                    return CheckResult(False, shrink(fails, state, bounds=bounds))
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            batch *= 2
+
+        self.samples += checked
+        return CheckResult(True)
+
+def _towards(value: int, target: int) -> List[int]:
+    # target, then halfway, three quarters, ... of the way to it, down to
+    # one step
+    candidates = []
+    delta = value - target
+    while delta != 0:
+        candidates.append(value - delta)
+        delta = delta // 2 if delta > 0 else -(-delta // 2)
+    return candidates
+
+def _nearest_zero(r: range) -> int:
+    # the value of a non-empty range closest to 0
+    if 0 in r:
+        return 0
+    return min(r[0], r[-1], key=abs)
+
+def shrink(fails: Callable[[State], bool], state: State, max_rounds: int = 100,
+           bounds: Optional[Dict[str, range]] = None) -> State:
+    """
+    Greedily moves each variable of a failing state towards 0 while the
+    state keeps failing. A variable with a range in `bounds` stays inside
+    it, and moves towards its value closest to 0.
+    """
+    bounds = bounds or {}
+    state = dict(state)
+    for _ in range(max_rounds):
+        changed = False
+        for name in state:
+            r = bounds.get(name)
+            if r is None:
+                candidates = _towards(state[name], 0)
+            elif not r:
+                continue
+            else:
+                candidates = [v for v in _towards(state[name], _nearest_zero(r)) if v in r]
+            for candidate in candidates:
+                smaller = {**state, name: candidate}
+                if fails(smaller):
+                    state = smaller
+                    changed = True
+                    break
+        if not changed:
+            break
+    return state
@@ -0,0 +1,169 @@
+import weakref
+from array import array
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterator, List, MutableSequence, Tuple
+
+from hoare import State, Stmt
+
+# Slot-indexed states
+# ===================
+# `assignH` copies the whole state dict on every assignment. Here the
+# variables of a program are interned to integer slots once, a state is a
+# single `array('q')`, and an assignment overwrites one slot in place.
+# Conditions and expressions still see a mapping: `s["x"]` goes through a
+# `SlotState` view of the array.
+#
+# Reading a program variable that is not part of the initial state before
+# it is first assigned raises KeyError, as it does with `evaluate`; one
+# that is never assigned is left out of the final state. Values that do
+# not fit in a signed 64-bit integer make `array` raise OverflowError; the
+# run then starts over with the values in a plain list.
+
+# an `array('q')`, or a list once a value overflows it
+Values = MutableSequence[int]
+
+class SlotLayout:
+    __slots__ = ("names", "index", "fresh")
+
+    def __init__(self, names: Tuple[str, ...], fresh: int) -> None:
+        self.names = names
+        self.index = {name: i for i, name in enumerate(names)}
+        # slots from `fresh` on are not part of the initial state
+        self.fresh = fresh
+
+    def pack(self, state: State) -> array:
+        return array("q", [state.get(name, 0) for name in self.names])
+
+    def pack_list(self, state: State) -> List[int]:
+        return [state.get(name, 0) for name in self.names]
+
+    def unpack(self, values: Values, defined: bytearray) -> State:
+        names = self.names
+        fresh = self.fresh
+        return {
+            names[i]: values[i]
+            for i in range(len(names))
+            if i < fresh or defined[i - fresh]
+        }
+
+class SlotState(Mapping):
+    __slots__ = ("_index", "_values", "_defined", "_fresh")
+
+    def __init__(self, layout: SlotLayout, values: Values, defined: bytearray) -> None:
+        self._index = layout.index
+        self._values = values
+        self._defined = defined
+        self._fresh = layout.fresh
+
+    def __getitem__(self, name: str) -> int:
+        i = self._index[name]
+        if i >= self._fresh and not self._defined[i - self._fresh]:
+            raise KeyError(name)
+        return self._values[i]
+
+    def __iter__(self) -> Iterator[str]:
+        fresh = self._fresh
+        defined = self._defined
+        return (name for name, i in self._index.items() if i < fresh or defined[i - fresh])
+
+    def __len__(self) -> int:
+        return self._fresh + sum(self._defined)
+
+# Runs a program against (values, defined, view), updating them in place
+SlotProgram = Callable[[Values, bytearray, SlotState], None]
+
+def assigned_vars(stmt: Stmt) -> List[str]:
+    names: List[str] = []
+
+    def walk(stmt: Stmt) -> None:
+        stmt.match(
+            skip=lambda: None,
+            assign=lambda x, a: None if x in names else names.append(x),
+            seq=lambda s1, s2: (walk(s1), walk(s2)),
+            if_then_else=lambda b, s1, s2: (walk(s1), walk(s2)),
+            while_do=lambda b, s: walk(s),
+        )
+
+    walk(stmt)
+    return names
+
+def layout_for(stmt: Stmt, state: State) -> SlotLayout:
+    names = list(state)
+    fresh = len(names)
+    names.extend(x for x in assigned_vars(stmt) if x not in state)
+    return SlotLayout(tuple(names), fresh)
+
+_compiled: "weakref.WeakKeyDictionary[Stmt, Dict[Tuple[str, ...], Tuple[SlotLayout, SlotProgram]]]" = weakref.WeakKeyDictionary()
+
+def compile_slots(stmt: Stmt, layout: SlotLayout) -> SlotProgram:
+    return stmt.match(
+        skip=lambda: _skip,
+        assign=lambda x, a: _compile_assign(layout, x, a),
+        seq=lambda s1, s2: _compile_seq(compile_slots(s1, layout), compile_slots(s2, layout)),
+        if_then_else=lambda b, s1, s2: _compile_if(b, compile_slots(s1, layout), compile_slots(s2, layout)),
+        while_do=lambda b, s: _compile_while(b, compile_slots(s, layout)),
+    )
+
+def _skip(values: Values, defined: bytearray, view: SlotState) -> None:
+    pass
+
+def _compile_assign(layout: SlotLayout, x: str, a: Callable[[State], int]) -> SlotProgram:
+    slot = layout.index[x]
+    if slot < layout.fresh:
+        def run(values: Values, defined: bytearray, view: SlotState) -> None:
+            values[slot] = a(view)
+        return run
+
+    flag = slot - layout.fresh
+    def run_fresh(values: Values, defined: bytearray, view: SlotState) -> None:
+        values[slot] = a(view)
+        defined[flag] = 1
+    return run_fresh
+
+def _compile_seq(first: SlotProgram, second: SlotProgram) -> SlotProgram:
+    def run(values: Values, defined: bytearray, view: SlotState) -> None:
+        first(values, defined, view)
+        second(values, defined, view)
+    return run
+
+def _compile_if(b: Callable[[State], bool], then_branch: SlotProgram, else_branch: SlotProgram) -> SlotProgram:
+    def run(values: Values, defined: bytearray, view: SlotState) -> None:
+        if b(view):
+            then_branch(values, defined, view)
+        else:
+            else_branch(values, defined, view)
+    return run
+
+def _compile_while(b: Callable[[State], bool], body: SlotProgram) -> SlotProgram:
+    def run(values: Values, defined: bytearray, view: SlotState) -> None:
+        while b(view):
+            body(values, defined, view)
+    return run
+
+def _program_for(stmt: Stmt, state: State) -> Tuple[SlotLayout, SlotProgram]:
+    by_names = _compiled.get(stmt)
+    if by_names is None:
+        by_names = _compiled[stmt] = {}
+    key = tuple(state)
+    entry = by_names.get(key)
+    if entry is None:
+        layout = layout_for(stmt, state)
+        entry = by_names[key] = (layout, compile_slots(stmt, layout))
+    return entry
+
+def evaluate_slots(stmt: Stmt, state: State) -> State:
+    """
+    Same result as `evaluate(stmt, state)`, computed on a slot-indexed
+    copy of `state`. Layouts and compiled programs are cached per program
+    and per set of initial variables.
+    """
+    layout, run = _program_for(stmt, state)
+    try:
+        return _run_slots(layout, run, layout.pack(state))
+    except OverflowError:
+        return _run_slots(layout, run, layout.pack_list(state))
+
+def _run_slots(layout: SlotLayout, run: SlotProgram, values: Values) -> State:
+    defined = bytearray(len(layout.names) - layout.fresh)
+    run(values, defined, SlotState(layout, values, defined))
+    return layout.unpack(values, defined)
@@ -0,0 +1,110 @@
+from typing import Any, Dict
+
+import z3
+
+from domain import Domain, reads
+from hoare import CheckResult, Condition, enumerate_backend
+from symbolic import Sym, SymState, Untraceable, trace
+
+# SMT backend
+# ===========
+# Decides `check_equal`/`check_implies` over the unbounded integers by
+# tracing both conditions into `Sym` expressions (see symbolic.py) and
+# asking z3 for a state that separates them. Conditions that cannot be
+# traced, and checks z3 gives up on, fall back to enumerating the domain.
+#
+#     from hoare import set_backend
+#     from smt import smt_backend
+#     set_backend(smt_backend)
+
+# per-check solver timeout
+TIMEOUT_MS = 5000
+
+# counts of how checks were decided, for benchmarking
+STATS = {"smt": 0, "untraceable": 0, "unknown": 0}
+
+def _as_int(e: Any) -> Any:
+    return z3.If(e, z3.IntVal(1), z3.IntVal(0)) if z3.is_bool(e) else e
+
+def _as_bool(e: Any) -> Any:
+    return e if z3.is_bool(e) else e != 0
+
+def _floordiv(x: Any, y: Any) -> Any:
+    # z3 integer division rounds towards -inf only for positive divisors
+    return z3.If(y > 0, x / y, (-x) / (-y))
+
+def to_z3(e: Sym, memo: Dict[int, Any]) -> Any:
+    done = memo.get(id(e))
+    if done is not None:
+        return done
+
+    op = e.op
+    if op == "var":
+        out = z3.Int(e.args[0])
+    elif op == "const":
+        value = e.args[0]
+        if isinstance(value, bool):
+            out = z3.BoolVal(value)
+        elif isinstance(value, int):
+            out = z3.IntVal(value)
+        else:
+            raise Untraceable(f"constant {value!r} is not an integer")
+    elif op == "neg":
+        out = -_as_int(to_z3(e.args[0], memo))
+    elif op == "ite":
+        c, t, f = (to_z3(arg, memo) for arg in e.args)
+        if z3.is_bool(t) != z3.is_bool(f):
+            t, f = _as_int(t), _as_int(f)
+        out = z3.If(_as_bool(c), t, f)
+    elif op in ("==", "!=") and z3.is_bool(to_z3(e.args[0], memo)) and z3.is_bool(to_z3(e.args[1], memo)):
+        x, y = to_z3(e.args[0], memo), to_z3(e.args[1], memo)
+        out = x == y if op == "==" else x != y
+    else:
+        x, y = _as_int(to_z3(e.args[0], memo)), _as_int(to_z3(e.args[1], memo))
+        if op == "+": out = x + y
+        elif op == "-": out = x - y
+        elif op == "*": out = x * y
+        elif op == "//": out = _floordiv(x, y)
+        elif op == "%": out = x - y * _floordiv(x, y)
+        elif op == "==": out = x == y
+        elif op == "!=": out = x != y
+        elif op == "<": out = x < y
+        elif op == "<=": out = x <= y
+        elif op == ">": out = x > y
+        elif op == ">=": out = x >= y
+        else:
+            raise Untraceable(f"unknown operator {op}")
+
+    memo[id(e)] = out
+    return out
+
+def to_formula(P: Condition) -> Any:
+    # the state claims every variable P reads, so `subst` copies carry them
+    state = SymState(sorted(reads(P)))
+    return _as_bool(to_z3(trace(P, state), {}))
+
+def smt_backend(kind: str, P1: Condition, P2: Condition, domain: Domain) -> CheckResult:
+    try:
+        f1 = to_formula(P1)
+        f2 = to_formula(P2)
+    except Untraceable:
+        STATS["untraceable"] += 1
+        return enumerate_backend(kind, P1, P2, domain)
+
+    solver = z3.Solver()
+    solver.set("timeout", TIMEOUT_MS)
+    solver.add(f1 != f2 if kind == "equal" else z3.And(f1, z3.Not(f2)))
+    answer = solver.check()
+
+    if answer == z3.unsat:
+        STATS["smt"] += 1
+        return CheckResult(True)
+    if answer == z3.sat:
+        STATS["smt"] += 1
+        model = solver.model()
+        return CheckResult(False, {
+            name: model.eval(z3.Int(name), model_completion=True).as_long()
+            for name in sorted(reads(P1) | reads(P2))
+        })
+    STATS["unknown"] += 1
+    return enumerate_backend(kind, P1, P2, domain)
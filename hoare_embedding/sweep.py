@@ -0,0 +1,210 @@
+import inspect
+import itertools
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from conditions import Conj, Neg, Subst
+from domain import Domain, domain_for, get_domain
+from hoare import State
+from kernels import Kernel, compile_kernel, domain_columns
+from obligations import Failure, Obligation, deferred
+from symbolic import SymState, Untraceable, trace, var
+from truth_table import bitset_backend
+
+# Parameter sweeps
+# ================
+# `proof(a, b)` builds closures over a and b, so checking it for 10,000
+# pairs normally means 10,000 proof runs, each checking every side
+# condition on its own. A sweep runs the proof once, with a and b bound
+# to symbolic parameters (symbolic.py) and the side conditions deferred
+# (obligations.py). Each recorded condition is traced into an
+# expression over the state variables and the parameters, and compiled
+# to one NumPy kernel (kernels.py) that is evaluated over a
+# parameters × states array: one row per (a, b), one column per state
+# of the domain.
+#
+# Proofs that branch on their parameters outside of a condition (e.g.
+# `if a > 0:` or `range(a)`) cannot run symbolically and are swept one
+# point at a time instead. So are single side conditions that cannot be
+# traced, e.g. ones calling `sumUpTo`: for those, the proof is re-run
+# per point and only they are checked.
+#
+#     result = sweep(add_proof, a=range(100), b=range(100))
+#     result.ok            # one bool per (a, b)
+#     for point, failure in result.failing():
+#         print(point, failure)
+
+# parameters × states evaluated per kernel call
+CHUNK = 1 << 22
+
+@dataclass
+class SweepResult:
+    names: Tuple[str, ...]
+    # one row per parameter point, one column per name
+    points: np.ndarray
+    ok: np.ndarray
+    # whether every point ran the proof on its own (see `sweep_loop`)
+    fallback: bool
+    # the first failing side condition of a failing point, by row
+    failure: Callable[[int], Failure] = field(repr=False)
+
+    def __bool__(self) -> bool:
+        return bool(self.ok.all())
+
+    def point(self, i: int) -> Dict[str, int]:
+        return dict(zip(self.names, self.points[i].tolist()))
+
+    def failing(self) -> Iterator[Tuple[Dict[str, int], Failure]]:
+        for i in np.flatnonzero(~self.ok).tolist():
+            yield self.point(i), self.failure(i)
+
+def grid(names: Sequence[str], values: Dict[str, Sequence[int]]) -> np.ndarray:
+    """Every combination of `values`, one row per point, columns in `names` order."""
+    rows = list(itertools.product(*(values[name] for name in names)))
+    return np.array(rows, dtype=np.int64).reshape(len(rows), len(names))
+
+# Tracing
+# =======
+
+def _param(name: str) -> str:
+    # kernel column of a parameter, apart from any state variable
+    return f"${name}"
+
+def _names(P: Callable[[State], object]) -> Set[str]:
+    """State variables `P` may read, over all of its paths."""
+    if isinstance(P, Conj):
+        return _names(P.P) | _names(P.Q)
+    if isinstance(P, Neg):
+        return _names(P.P)
+    if isinstance(P, Subst):
+        names = _names(P.P)
+        for _, a in P.updates:
+            names |= _names(a)
+        return names
+    state = SymState()
+    trace(P, state)
+    return set(state.reads)
+
+@dataclass
+class _Kernels:
+    kind: str
+    domain: Domain
+    P1: Kernel
+    P2: Kernel
+
+def _compile(ob: Obligation) -> _Kernels:
+    # Subst copies the state with dict(), so the state must claim every
+    # variable up front
+    names = tuple(sorted(_names(ob.P1) | _names(ob.P2)))
+    P1 = trace(ob.P1, SymState(names))
+    P2 = trace(ob.P2, SymState(names))
+    return _Kernels(ob.kind, get_domain(names), compile_kernel(P1), compile_kernel(P2))
+
+def _state_columns(domain: Domain) -> Dict[str, np.ndarray]:
+    # one column per state, shaped to broadcast against parameter rows
+    return {name: col.reshape(1, -1) for name, col in domain_columns(domain).items()}
+
+def _fails(k: _Kernels, cols: Dict[str, np.ndarray], shape: Tuple[int, int]) -> np.ndarray:
+    # conditions may return ints; like the other backends, compare truth
+    v1 = np.broadcast_to(k.P1(cols), shape).astype(bool)
+    v2 = np.broadcast_to(k.P2(cols), shape).astype(bool)
+    if k.kind == "equal":
+        return v1 != v2
+    return v1 & ~v2
+
+# Sweeping
+# ========
+
+def _record(proof: Callable[..., object], args: Sequence[object]) -> List[Obligation]:
+    with deferred() as ctx:
+        proof(*args)
+    return [ob for ob in ctx.obligations if ob.P1 is not ob.P2]
+
+def _check_point(proof: Callable[..., object], row: np.ndarray,
+                 only: Optional[Set[int]] = None) -> Optional[Failure]:
+    for i, ob in enumerate(_record(proof, row.tolist())):
+        if only is not None and i not in only:
+            continue
+        result = bitset_backend(ob.kind, ob.P1, ob.P2, domain_for(ob.P1, ob.P2))
+        if not result:
+            return Failure(ob, result.counterexample)
+    return None
+
+def sweep_loop(proof: Callable[..., object], **values: Sequence[int]) -> SweepResult:
+    """The same result as `sweep`, running the proof once per point."""
+    names = tuple(inspect.signature(proof).parameters)
+    points = grid(names, values)
+    failures = {}
+    for i, row in enumerate(points):
+        failure = _check_point(proof, row)
+        if failure is not None:
+            failures[i] = failure
+    ok = np.ones(len(points), dtype=bool)
+    ok[list(failures)] = False
+    return SweepResult(names, points, ok, True, failures.__getitem__)
+
+def sweep(proof: Callable[..., object], **values: Sequence[int]) -> SweepResult:
+    """
+    Checks `proof` for every combination of `values`, given per
+    parameter name, with its side conditions evaluated for all points
+    at once.
+    """
+    names = tuple(inspect.signature(proof).parameters)
+    try:
+        obligations = _record(proof, [var(_param(name)) for name in names])
+    except Exception:
+        # branches on a parameter, or otherwise needs concrete values
+        return sweep_loop(proof, **values)
+
+    points = grid(names, values)
+    n = len(obligations)
+    # per point, the first failing traced obligation (n if none) and
+    # the index of its counterexample in the obligation's domain
+    first = np.full(len(points), n, dtype=np.int64)
+    cex = np.zeros(len(points), dtype=np.int64)
+    domains: Dict[int, Domain] = {}
+    untraceable: List[int] = []
+    for index, ob in enumerate(obligations):
+        try:
+            k = _compile(ob)
+        except Untraceable:
+            untraceable.append(index)
+            continue
+        domains[index] = k.domain
+        states = _state_columns(k.domain)
+        # only points without an earlier failure
+        todo = np.flatnonzero(first == n)
+        rows = max(1, CHUNK // max(1, len(k.domain)))
+        for start in range(0, len(todo), rows):
+            chunk = todo[start:start + rows]
+            cols = dict(states)
+            cols.update({_param(name): points[chunk, j:j + 1] for j, name in enumerate(names)})
+            fails = _fails(k, cols, (len(chunk), len(k.domain)))
+            bad = fails.any(axis=1)
+            first[chunk[bad]] = index
+            cex[chunk[bad]] = fails[bad].argmax(axis=1)
+
+    # untraceable obligations before the first traced failure are
+    # checked point by point
+    pending: Dict[int, Failure] = {}
+    if untraceable:
+        for i, row in enumerate(points):
+            before = {u for u in untraceable if u < first[i]}
+            failure = _check_point(proof, row, before) if before else None
+            if failure is not None:
+                pending[i] = failure
+    ok = (first == n)
+    ok[list(pending)] = False
+
+    def failure(i: int) -> Failure:
+        if i in pending:
+            return pending[i]
+        # report the obligation as the concrete proof records it, so its
+        # conditions can be called like any other
+        index = int(first[i])
+        ob = _record(proof, points[i].tolist())[index]
+        return Failure(ob, domains[index].states[int(cex[i])])
+
+    return SweepResult(names, points, ok, False, failure)
@@ -0,0 +1,249 @@
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Symbolic tracing
+# ================
+# Conditions and expressions are opaque lambdas over `s["var"]`. To look
+# inside one, we call it with a state whose values are `Sym` nodes: the
+# arithmetic and comparisons the lambda performs build an expression
+# graph instead of computing a value.
+#
+# `and`/`or`/`not`/`if` ask a value for its truth (`__bool__`). A symbolic
+# value has none, so tracing forks: the lambda is re-run once with the
+# condition taken as true and once as false, and the two results are
+# joined into `ite(cond, then, else)`. Lambdas that keep branching (e.g.
+# the recursion in `sumUpTo`) run out of paths and are `Untraceable`.
+
+class Untraceable(Exception):
+    pass
+
+# arithmetic and comparison operators, by the name `Sym.op` uses
+ARITH = ("+", "-", "*", "//", "%")
+COMPARE = ("==", "!=", "<", "<=", ">", ">=")
+
+class Sym:
+    """
+    Node of an expression graph. `op` is "var" (args: name), "const"
+    (args: value), "neg", one of ARITH or COMPARE (args: two nodes), or
+    "ite" (args: cond, then, else).
+    """
+    __slots__ = ("op", "args")
+
+    # keep numpy from broadcasting over a Sym operand; it defers to our
+    # reflected operators instead
+    __array_ufunc__ = None
+
+    def __init__(self, op: str, args: Tuple) -> None:
+        self.op = op
+        self.args = args
+
+    # `==` builds a node, so hashing is by identity
+    __hash__ = object.__hash__
+
+    def __repr__(self) -> str:
+        return show(self)
+
+    def __bool__(self) -> bool:
+        return _decide(self)
+
+    def __index__(self) -> int:
+        raise Untraceable(f"{self} used as a concrete integer")
+
+    __int__ = __index__
+
+    def __neg__(self) -> "Sym":
+        return Sym("neg", (self,))
+
+    def __pos__(self) -> "Sym":
+        return self
+
+    def __abs__(self) -> "Sym":
+        return ite(Sym("<", (self, const(0))), -self, self)
+
+    def __add__(self, other: Any) -> "Sym": return Sym("+", (self, lift(other)))
+    def __radd__(self, other: Any) -> "Sym": return Sym("+", (lift(other), self))
+    def __sub__(self, other: Any) -> "Sym": return Sym("-", (self, lift(other)))
+    def __rsub__(self, other: Any) -> "Sym": return Sym("-", (lift(other), self))
+    def __mul__(self, other: Any) -> "Sym": return Sym("*", (self, lift(other)))
+    def __rmul__(self, other: Any) -> "Sym": return Sym("*", (lift(other), self))
+    def __floordiv__(self, other: Any) -> "Sym": return Sym("//", (self, lift(other)))
+    def __rfloordiv__(self, other: Any) -> "Sym": return Sym("//", (lift(other), self))
+    def __mod__(self, other: Any) -> "Sym": return Sym("%", (self, lift(other)))
+    def __rmod__(self, other: Any) -> "Sym": return Sym("%", (lift(other), self))
+
+    def __eq__(self, other: Any) -> "Sym": return Sym("==", (self, lift(other)))  # type: ignore[override]
+    def __ne__(self, other: Any) -> "Sym": return Sym("!=", (self, lift(other)))  # type: ignore[override]
+    def __lt__(self, other: Any) -> "Sym": return Sym("<", (self, lift(other)))
+    def __le__(self, other: Any) -> "Sym": return Sym("<=", (self, lift(other)))
+    def __gt__(self, other: Any) -> "Sym": return Sym(">", (self, lift(other)))
+    def __ge__(self, other: Any) -> "Sym": return Sym(">=", (self, lift(other)))
+
+def var(name: str) -> Sym:
+    return Sym("var", (name,))
+
+def const(value: Any) -> Sym:
+    return Sym("const", (value,))
+
+def lift(value: Any) -> Sym:
+    if isinstance(value, Sym):
+        return value
+    return const(value)
+
+def ite(cond: Sym, then: Any, other: Any) -> Sym:
+    return Sym("ite", (cond, lift(then), lift(other)))
+
+def show(e: Sym) -> str:
+    if e.op == "var":
+        return e.args[0]
+    if e.op == "const":
+        return repr(e.args[0])
+    if e.op == "neg":
+        return f"-{show(e.args[0])}"
+    if e.op == "ite":
+        c, t, f = e.args
+        return f"({show(t)} if {show(c)} else {show(f)})"
+    return f"({show(e.args[0])} {e.op} {show(e.args[1])})"
+
+def free_vars(e: Sym) -> List[str]:
+    names: List[str] = []
+    seen = set()
+    todo = [e]
+    while todo:
+        node = todo.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if node.op == "var":
+            if node.args[0] not in names:
+                names.append(node.args[0])
+        elif node.op != "const":
+            todo.extend(node.args)
+    return names
+
+# Path exploration
+# ================
+
+class _Branch(BaseException):
+    # BaseException, so that `except Exception` in traced code can't eat it
+    def __init__(self, cond: Sym) -> None:
+        self.cond = cond
+
+class _Oracle:
+    __slots__ = ("decisions", "pos")
+
+    def __init__(self, decisions: List[bool]) -> None:
+        self.decisions = decisions
+        self.pos = 0
+
+_oracle: Optional[_Oracle] = None
+
+def _decide(cond: Sym) -> bool:
+    if cond.op == "const":
+        return bool(cond.args[0])
+    oracle = _oracle
+    if oracle is None:
+        raise Untraceable(f"truth value of {cond} outside of a trace")
+    if oracle.pos < len(oracle.decisions):
+        decision = oracle.decisions[oracle.pos]
+        oracle.pos += 1
+        return decision
+    raise _Branch(cond)
+
+class SymState(Mapping):
+    """
+    State whose values are the variables themselves. `names` are the
+    variables it claims to hold (so `{**s, ...}` copies them); reading
+    any other name also works and is recorded in `reads`.
+    """
+    __slots__ = ("values", "reads")
+
+    def __init__(self, names: Iterable[str] = (), values: Optional[Dict[str, Any]] = None) -> None:
+        self.values: Dict[str, Any] = {name: var(name) for name in names}
+        if values:
+            self.values.update(values)
+        self.reads: List[str] = []
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self.reads:
+            self.reads.append(name)
+        value = self.values.get(name)
+        if value is None:
+            value = self.values[name] = var(name)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.values)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+MAX_PATHS = 64
+
+def trace(f: Callable[[Any], Any], state: Optional[SymState] = None, max_paths: int = MAX_PATHS) -> Sym:
+    """
+    Traces `f` on a symbolic state and returns the expression it computes.
+    Raises Untraceable if `f` fails on symbolic values or branches over
+    more than `max_paths` paths.
+    """
+    if state is None:
+        state = SymState()
+    runs = 0
+
+    def explore(decisions: List[bool]) -> Sym:
+        nonlocal runs
+        global _oracle
+        runs += 1
+        if runs > max_paths:
+            raise Untraceable(f"more than {max_paths} paths")
+
+        outer = _oracle
+        _oracle = _Oracle(decisions)
+        try:
+            value = f(state)
+        except _Branch as branch:
+            cond = branch.cond
+        except Untraceable:
+            raise
+        except RecursionError:
+            raise Untraceable("recursion on a symbolic value")
+        except Exception as e:
+            raise Untraceable(f"{type(e).__name__}: {e}")
+        else:
+            return lift(value)
+        finally:
+            _oracle = outer
+
+        return ite(cond, explore(decisions + [True]), explore(decisions + [False]))
+
+    return explore([])
+
+# Concrete evaluation
+# ===================
+
+_BINARY: Dict[str, Callable[[Any, Any], Any]] = {
+    "+": lambda x, y: x + y,
+    "-": lambda x, y: x - y,
+    "*": lambda x, y: x * y,
+    "//": lambda x, y: x // y,
+    "%": lambda x, y: x % y,
+    "==": lambda x, y: x == y,
+    "!=": lambda x, y: x != y,
+    "<": lambda x, y: x < y,
+    "<=": lambda x, y: x <= y,
+    ">": lambda x, y: x > y,
+    ">=": lambda x, y: x >= y,
+}
+
+def evaluate_sym(e: Sym, env: Mapping) -> Any:
+    """Evaluates `e` with the variables bound by `env`."""
+    op = e.op
+    if op == "var":
+        return env[e.args[0]]
+    if op == "const":
+        return e.args[0]
+    if op == "neg":
+        return -evaluate_sym(e.args[0], env)
+    if op == "ite":
+        c, t, f = e.args
+        return evaluate_sym(t, env) if evaluate_sym(c, env) else evaluate_sym(f, env)
+    return _BINARY[op](evaluate_sym(e.args[0], env), evaluate_sym(e.args[1], env))
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import batch
+import derivation
+import hoare
+import run_proofs
+import validate
+
+# Regression tests
+# ================
+# Cases from review that the benchmarks and examples do not cover. Run
+# from this directory with `python -m pytest -q test_regressions.py`.
+
+# a proof whose postcondition reads the global K
+K_PROOF = """
+K = 1
+
+def proof():
+    return consequence(lambda s: s["x"] == 1, skip_intro(lambda s: s["x"] >= K), lambda s: s["x"] >= K)
+"""
+
+def test_rebinding_a_global_is_not_answered_from_the_cache():
+    namespace = {**vars(hoare)}
+    exec(K_PROOF, namespace)
+    namespace["proof"]()
+    namespace["K"] = 5
+    with pytest.raises(AssertionError):
+        namespace["proof"]()
+
+def test_verify_rechecks_steps_after_editing_a_global():
+    namespace = {**vars(hoare), **vars(derivation)}
+    exec(K_PROOF, namespace)
+    derivation.verify(namespace["proof"]())
+    exec(K_PROOF.replace("K = 1", "K = 5"), namespace)
+    with pytest.raises(AssertionError):
+        derivation.verify(namespace["proof"]())
+
+# the guard reads y only on lanes where x == 20, and the batch has no y
+def test_batch_guard_reading_a_variable_the_batch_lacks():
+    guard = lambda s: s["x"] == 20 and s["y"] <= 20
+    program = hoare.Stmt.IF_THEN_ELSE(guard, hoare.Stmt.ASSIGN("r", lambda s: 1), hoare.Stmt.ASSIGN("r", lambda s: 0))
+    final, _ = batch.evaluate_batch(program, {"x": np.arange(10)}, lanes=10)
+    assert list(final["r"]) == [hoare.evaluate(program, {"x": x})["r"] for x in range(10)]
+
+# the domain only has x, and the precondition reads y once x == 20
+def test_batch_validation_of_a_condition_reading_a_variable_outside_the_domain():
+    P = lambda s: s["x"] == 20 and s["y"] <= 20
+    found = validate.validate(hoare.Stmt.SKIP(), P, lambda s: True, engine="batch", workers=1)
+    assert found and found.checked == 0
+
+def test_assignments_of_different_values_are_different_programs():
+    S = hoare.Stmt.ASSIGN("r", lambda s: s["r"] + s["m"])
+    T = hoare.Stmt.ASSIGN("r", lambda s: s["r"] + 2 * s["m"])
+    assert run_proofs.same_program(S, S)
+    assert not run_proofs.same_program(S, T)
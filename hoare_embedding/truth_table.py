@@ -0,0 +1,70 @@
+import time
+
+from conditions import Conj, Neg
+from domain import Domain
+from hoare import CheckResult, Condition
+from memo import LRUCache, condition_key
+
+try:
+    import numpy as np
+    from kernels import domain_columns, kernel_for
+except ImportError:
+    # without numpy, every table is built state by state
+    kernel_for = None
+
+# Truth tables
+# ============
+# Within one proof the same few conditions are checked over the same
+# domain again and again. Here each condition is evaluated once per
+# domain into a bitset (a Python int, bit i set iff the condition holds
+# in `domain.states[i]`). Conjunction and negation are then bitwise
+# operations, and a check is a compare of two ints.
+#
+#     from hoare import set_backend
+#     from truth_table import bitset_backend
+#     set_backend(bitset_backend)
+
+TABLES = LRUCache(maxsize=4096)
+
+def full(domain: Domain) -> int:
+    return (1 << len(domain.states)) - 1
+
+def materialize(P: Condition, domain: Domain) -> int:
+    kernel = kernel_for(P) if kernel_for is not None else None
+    if kernel is not None and kernel.names <= set(domain.names):
+        holds = np.broadcast_to(kernel(domain_columns(domain)), (len(domain),)).astype(bool)
+        return int.from_bytes(np.packbits(holds, bitorder="little").tobytes(), "little")
+
+    bits = 0
+    for i, state in enumerate(domain.states):
+        if P(state):
+            bits |= 1 << i
+    return bits
+
+def truth_table(P: Condition, domain: Domain) -> int:
+    key = (condition_key(P), domain.key)
+    entry = TABLES.get(key)
+    if entry is not None:
+        return entry[0]
+
+    start = time.perf_counter()
+    if isinstance(P, Conj):
+        bits = truth_table(P.P, domain) & truth_table(P.Q, domain)
+    elif isinstance(P, Neg):
+        bits = full(domain) & ~truth_table(P.P, domain)
+    else:
+        bits = materialize(P, domain)
+    # keep P alive so identity-based parts of its key stay valid
+    TABLES.put(key, (bits, P), cost=time.perf_counter() - start)
+    return bits
+
+def lowest_bit(bits: int) -> int:
+    return (bits & -bits).bit_length() - 1
+
+def bitset_backend(kind: str, P1: Condition, P2: Condition, domain: Domain) -> CheckResult:
+    t1 = truth_table(P1, domain)
+    t2 = truth_table(P2, domain)
+    bad = t1 ^ t2 if kind == "equal" else t1 & ~t2
+    if bad:
+        return CheckResult(False, domain.states[lowest_bit(bad)])
+    return CheckResult(True)
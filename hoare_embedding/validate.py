@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from batch import evaluate_batch
+from compiler import Compiled, _compile, compile_stmt
+from domain import Domain, get_domain, range_for, reads
+from hoare import Condition, State, Stmt
+from kernels import domain_columns, evaluate_over
+from sampling import Distribution, as_distribution, shrink
+
+# Triple validation
+# =================
+# Before anyone writes a proof of {P} S {Q}, check that it is not simply
+# false: run S from every state that satisfies P and look at Q
+# afterwards. Runs are cut off after `fuel` loop iterations and count as
+# out of fuel rather than as failures, since the triples are about
+# partial correctness.
+#
+# The initial states come from one of three engines:
+#
+#   enumerate  every state of the domain, run one at a time
+#   sample     `samples` random states (see sampling.py), run one at a
+#              time; a counterexample is shrunk towards 0, inside the
+#              ranges the states are drawn from
+#   batch      every state of the domain, run as NumPy lanes (batch.py)
+#
+# The domain ranges over the variables P reads and the ones S or Q read
+# before S assigns them, with the usual `configure_domain` ranges. The
+# work is split into chunks and spread over a pool of forked workers;
+# the first chunk with a counterexample stops the run, and the
+# counterexample reported is the first one in domain order (or draw
+# order, for `sample`).
+#
+#     result = validate(MUL, P, Q, engine="batch")
+#     if not result:
+#         print(result.counterexample, "->", result.final)
+#
+# From the command line, for the triples in programs/*.test:
+#
+#     python validate.py MUL ADD --engine batch --set a=3 --set b=4
+
+ENGINES = ("enumerate", "sample", "batch")
+
+# states per work unit; `batch` lanes are cheaper, so it takes more
+CHUNK = 256
+BATCH_CHUNK = 1 << 14
+
+@dataclass
+class Validation:
+    engine: str
+    # initial states satisfying P that were run
+    checked: int
+    # of those, runs cut off by `fuel`
+    out_of_fuel: int
+    # a state satisfying P from which S ends outside Q, or fails
+    counterexample: Optional[State] = None
+    # what S does from it: the final state, or the exception it raised
+    final: Optional[Union[State, str]] = None
+    seconds: float = 0.0
+
+    def __bool__(self) -> bool:
+        return self.counterexample is None
+
+    def __str__(self) -> str:
+        runs = f"{self.checked} runs, {self.out_of_fuel} out of fuel, {self.seconds * 1000:.1f}ms"
+        if self:
+            return f"valid ({runs})"
+        return f"fails from {self.counterexample} -> {self.final} ({runs})"
+
+# Domain
+# ======
+
+def _inputs(stmt: Stmt, defined: FrozenSet[str]) -> Tuple[Set[str], FrozenSet[str]]:
+    # variables `stmt` reads before assigning them, and the variables
+    # assigned on every path through it
+    def read(f: Callable[[State], Any]) -> Set[str]:
+        return set(reads(f) - defined)
+
+    def seq(s1: Stmt, s2: Stmt) -> Tuple[Set[str], FrozenSet[str]]:
+        needed1, after1 = _inputs(s1, defined)
+        needed2, after2 = _inputs(s2, after1)
+        return needed1 | needed2, after2
+
+    def if_then_else(b: Condition, s1: Stmt, s2: Stmt) -> Tuple[Set[str], FrozenSet[str]]:
+        needed1, after1 = _inputs(s1, defined)
+        needed2, after2 = _inputs(s2, defined)
+        return read(b) | needed1 | needed2, after1 & after2
+
+    def while_do(b: Condition, s: Stmt) -> Tuple[Set[str], FrozenSet[str]]:
+        # the body may not run at all
+        return read(b) | _inputs(s, defined)[0], defined
+
+    return stmt.match(
+        skip=lambda: (set(), defined),
+        assign=lambda x, a: (read(a), defined | {x}),
+        seq=seq,
+        if_then_else=if_then_else,
+        while_do=while_do,
+    )
+
+def validation_domain(stmt: Stmt, P: Condition, Q: Condition) -> Domain:
+    needed, assigned = _inputs(stmt, frozenset())
+    names = needed | reads(P) | (reads(Q) - assigned)
+    return get_domain(tuple(sorted(names)))
+
+# Engines
+# =======
+# Each works on one chunk and returns (runs, out of fuel, counterexample
+# or None, final). Workers find the job in `_JOB`, inherited through fork,
+# since lambdas cannot be pickled.
+
+@dataclass
+class _Job:
+    stmt: Stmt
+    P: Condition
+    Q: Condition
+    domain: Domain
+    fuel: Optional[int]
+    seed: int
+    draws: List[Tuple[str, Distribution]]
+    # the ranges `draws` come from, which shrinking stays inside
+    bounds: Dict[str, range]
+    # the compiled program, and the fuel it has left in the current run
+    run: Compiled
+    left: List[int]
+
+_JOB: Optional[_Job] = None
+
+Found = Tuple[int, int, Optional[State], Optional[Union[State, str]]]
+
+class _OutOfFuel(Exception):
+    pass
+
+def _fueled(fuel: int) -> Tuple[Callable[..., Compiled], List[int]]:
+    # loop compiler for `_compile` that stops a run after `fuel`
+    # iterations, over all loops, like `evaluate_batch` does per lane;
+    # the run resets `left[0]` before it starts
+    left = [fuel]
+
+    def compile_while(b: Condition, s: Stmt, compile_while: Callable[..., Compiled]) -> Compiled:
+        body = _compile(s, compile_while)
+
+        def run(state: State) -> State:
+            while b(state):
+                if left[0] <= 0:
+                    raise _OutOfFuel()
+                left[0] -= 1
+                state = body(state)
+            return state
+        return run
+    return compile_while, left
+
+def _run(job: _Job, state: State) -> Tuple[bool, Optional[Union[State, str]]]:
+    """(out of fuel, final state or error) of a run from `state`."""
+    if job.fuel is not None:
+        job.left[0] = job.fuel
+    try:
+        return False, job.run(state)
+    except _OutOfFuel:
+        return True, None
+    except Exception as e:
+        return False, f"{type(e).__name__}: {e}"
+
+def _fails(job: _Job, state: State) -> Optional[Tuple[bool, Optional[Union[State, str]]]]:
+    # None when `state` is not an initial state
+    try:
+        if not job.P(state):
+            return None
+    except Exception:
+        return None
+    out_of_fuel, final = _run(job, state)
+    if out_of_fuel:
+        return True, None
+    if isinstance(final, str):
+        return False, final
+    try:
+        holds = job.Q(final)
+    except Exception as e:
+        return False, f"Q raised {type(e).__name__}: {e}"
+    return False, None if holds else final
+
+def _check_states(job: _Job, states: Iterator[State]) -> Found:
+    runs = out_of_fuel = 0
+    for state in states:
+        found = _fails(job, state)
+        if found is None:
+            continue
+        runs += 1
+        if found[0]:
+            out_of_fuel += 1
+        elif found[1] is not None:
+            return runs, out_of_fuel, state, found[1]
+    return runs, out_of_fuel, None, None
+
+def _enumerate(job: _Job, start: int, stop: int) -> Found:
+    return _check_states(job, iter(job.domain.states[start:stop]))
+
+def _sample(job: _Job, start: int, stop: int) -> Found:
+    # draw i comes from its own generator, so the states do not depend on
+    # how the draws are split into chunks
+    def draws() -> Iterator[State]:
+        for i in range(start, stop):
+            rng = random.Random(job.seed * 1000003 + i)
+            yield {name: draw(rng) for name, draw in job.draws}
+    runs, out_of_fuel, state, final = _check_states(job, draws())
+    if state is not None:
+        def fails(s: State) -> bool:
+            found = _fails(job, s)
+            return found is not None and found[1] is not None
+        state = shrink(fails, state, bounds=job.bounds)
+        final = _fails(job, state)[1]
+    return runs, out_of_fuel, state, final
+
+def _batch(job: _Job, start: int, stop: int) -> Found:
+    lanes = stop - start
+    cols = {name: col[start:stop] for name, col in domain_columns(job.domain).items()}
+    initial = evaluate_over(job.P, cols, lanes).astype(bool)
+    if not initial.any():
+        return 0, 0, None, None
+    index = np.flatnonzero(initial)
+    states = {name: col[index] for name, col in cols.items()}
+    final, diverged = evaluate_batch(job.stmt, states, fuel=job.fuel, lanes=len(index))
+    holds = evaluate_over(job.Q, final, len(index)).astype(bool)
+    bad = np.flatnonzero(~holds & ~diverged)
+    if len(bad) == 0:
+        return len(index), int(diverged.sum()), None, None
+    # rerun the first failing lane by itself: batch arithmetic wraps at
+    # 64 bits, and the state should be reported as `evaluate` sees it
+    first = int(bad[0])
+    state = {name: int(col[first]) for name, col in states.items()}
+    found = _fails(job, state)
+    if found is None or found[1] is None:
+        # only failed because of the batch semantics; rerun the chunk
+        return _check_states(job, iter(job.domain.states[start:stop]))
+    return first + 1, int(diverged[:first].sum()), state, found[1]
+
+_ENGINES = {"enumerate": _enumerate, "sample": _sample, "batch": _batch}
+
+def _work(chunk: Tuple[str, int, int]) -> Found:
+    engine, start, stop = chunk
+    return _ENGINES[engine](_JOB, start, stop)
+
+def validate(stmt: Stmt, P: Condition, Q: Condition, engine: str = "enumerate",
+             fuel: Optional[int] = 10000, workers: Optional[int] = None,
+             samples: int = 100000, seed: int = 0,
+             **distributions: Union[Distribution, range]) -> Validation:
+    """
+    Runs `stmt` from the initial states `engine` picks, until one of
+    them does not end in `Q`. `workers` defaults to one per core;
+    `samples`, `seed` and per-variable distributions (as for
+    `SamplingBackend`, defaulting to the domain ranges) are for the
+    `sample` engine.
+    """
+    global _JOB
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine {engine!r}, expected one of {ENGINES}")
+    start_time = time.perf_counter()
+    domain = validation_domain(stmt, P, Q)
+    specs = {name: distributions.get(name, range_for(name)) for name in domain.names}
+    draws = [(name, as_distribution(spec)) for name, spec in specs.items()]
+    bounds = {name: spec for name, spec in specs.items() if isinstance(spec, range)}
+    if fuel is None:
+        run, left = compile_stmt(stmt), [0]
+    else:
+        compile_while, left = _fueled(fuel)
+        run = _compile(stmt, compile_while)
+    job = _Job(stmt, P, Q, domain, fuel, seed, draws, bounds, run, left)
+
+    total = samples if engine == "sample" else len(domain)
+    size = BATCH_CHUNK if engine == "batch" else CHUNK
+    chunks = [(engine, start, min(start + size, total)) for start in range(0, total, size)]
+    # build the states once, before forking
+    if engine == "enumerate":
+        domain.states
+    elif engine == "batch":
+        domain_columns(domain)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(chunks))
+    result = Validation(engine, 0, 0)
+    outer, _JOB = _JOB, job
+    try:
+        if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+            _collect(result, map(_work, chunks))
+        else:
+            with multiprocessing.get_context("fork").Pool(workers) as pool:
+                # in order, so the first counterexample is the first one;
+                # leaving the block stops the chunks still running
+                _collect(result, pool.imap(_work, chunks))
+    finally:
+        _JOB = outer
+    result.seconds = time.perf_counter() - start_time
+    return result
+
+def _collect(result: Validation, found: Iterator[Found]) -> None:
+    for runs, out_of_fuel, state, final in found:
+        result.checked += runs
+        result.out_of_fuel += out_of_fuel
+        if state is not None:
+            result.counterexample = state
+            result.final = final
+            return
+
+# Command line
+# ============
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from corpus import load_test, program_names
+    from run_proofs import free_names
+
+    parser = argparse.ArgumentParser(description="Look for counterexamples to the triples in programs/*.test.")
+    parser.add_argument("names", nargs="*", help="programs to check (default: all)")
+    parser.add_argument("--engine", choices=ENGINES, default="batch")
+    parser.add_argument("--fuel", type=int, default=10000, help="loop iterations per run")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--samples", type=int, default=100000)
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="value of a triple parameter, e.g. a=3")
+    parser.add_argument("--value", type=int, default=3, help="value of parameters not --set")
+    args = parser.parse_args(argv)
+
+    given = {name: int(value) for name, value in (item.split("=", 1) for item in args.set)}
+    failed = False
+    for name in args.names or program_names():
+        params = {p: given.get(p, args.value) for p in free_names(name)}
+        test = load_test(name, **params)
+        result = validate(test.program, test.P, test.Q, engine=args.engine, fuel=args.fuel,
+                          workers=args.workers, samples=args.samples)
+        print(f"{name} {params}: {result}")
+        failed |= not result
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
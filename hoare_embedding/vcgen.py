@@ -0,0 +1,128 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+import hoare
+from conditions import Conj, Neg
+from hoare import (CheckResult, Condition, HoareTriple, Stmt, assign_intro, consequence,
+                   if_intro, seq_intro, skip_intro, while_intro)
+from memo import condition_key
+from obligations import KINDS, Obligation, ProofContext, Report
+from truth_table import bitset_backend
+
+# Verification conditions
+# =======================
+# Builds the proof of {P} S {Q} instead of having it written by hand.
+# Working backwards from Q, every statement gets the triple
+# {wp(S, Q)} S {Q} from the rules in hoare.py:
+#
+#     skip, x := a        skip_intro, assign_intro
+#     S1; S2              seq_intro of the two triples
+#     if B then S1 else   if_intro, with wp = (B → wp1) ∧ (¬B → wp2)
+#     while B do S        while_intro with the loop's invariant I, and
+#                         consequence on both sides; wp = I
+#
+# The rules' side conditions are collected rather than checked. Most
+# of them hold by construction (the two sides are the same condition,
+# or `(B → wp1) ∧ (¬B → wp2) ∧ B ⇒ wp1`) and are dropped. What is left
+# are the verification conditions proper: per loop, I ∧ B ⇒ wp(S, I)
+# and I ∧ ¬B ⇒ Q, and P ⇒ wp(S, Q) at the top.
+#
+#     invariants = {loop: I for loop in loops(MUL)}
+#     report = verify_program(MUL, P, Q, invariants)
+
+Invariants = Dict[Stmt, Condition]
+
+def loops(stmt: Stmt) -> List[Stmt]:
+    """The WHILE_DO nodes of `stmt`, outermost and first first."""
+    return stmt.match(
+        skip=lambda: [],
+        assign=lambda x, a: [],
+        seq=lambda s1, s2: loops(s1) + loops(s2),
+        if_then_else=lambda b, s1, s2: loops(s1) + loops(s2),
+        while_do=lambda b, s: [stmt] + loops(s),
+    )
+
+def implies(P: Condition, Q: Condition) -> Condition:
+    # P → Q as ¬(P ∧ ¬Q)
+    return Neg(Conj(P, Neg(Q)))
+
+class _Gen:
+    def __init__(self, invariants: Invariants) -> None:
+        self.invariants = invariants
+        self.obligations: List[Obligation] = []
+        # (kind, key of P1, key of P2) of side conditions that hold by
+        # construction
+        self.valid = set()
+        # what the next genuine side condition is, and where it comes from
+        self.label = ""
+        self.where = ""
+
+    def record(self, check: Callable[[Condition, Condition], CheckResult], P1: Condition, P2: Condition) -> None:
+        kind = KINDS[check.__name__]
+        k1, k2 = condition_key(P1), condition_key(P2)
+        if P1 is P2 or k1 == k2 or (kind, k1, k2) in self.valid:
+            return
+        self.obligations.append(Obligation(kind, P1, P2, self.label, self.where))
+
+    def triple(self, stmt: Stmt, Q: Condition, where: str) -> HoareTriple:
+        """{wp(stmt, Q)} stmt {Q}"""
+        return stmt.match(
+            skip=lambda: skip_intro(Q),
+            assign=lambda x, a: assign_intro(x, a, Q),
+            seq=lambda s1, s2: self.seq(s1, s2, Q, where),
+            if_then_else=lambda b, s1, s2: self.if_then_else(b, s1, s2, Q, where),
+            while_do=lambda b, s: self.while_do(stmt, b, s, Q, where),
+        )
+
+    def seq(self, s1: Stmt, s2: Stmt, Q: Condition, where: str) -> HoareTriple:
+        HT2 = self.triple(s2, Q, f"{where}.2")
+        HT1 = self.triple(s1, HT2[0], f"{where}.1")
+        return seq_intro(HT1, HT2)
+
+    def if_then_else(self, B: Condition, s1: Stmt, s2: Stmt, Q: Condition, where: str) -> HoareTriple:
+        HT1 = self.triple(s1, Q, f"{where}.then")
+        HT2 = self.triple(s2, Q, f"{where}.else")
+        P = Conj(implies(B, HT1[0]), implies(Neg(B), HT2[0]))
+        branches = []
+        for pre, HT in [(Conj(P, B), HT1), (Conj(P, Neg(B)), HT2)]:
+            self.valid.add(("implies", condition_key(pre), condition_key(HT[0])))
+            branches.append(consequence(pre, HT, Q))
+        return if_intro(P, B, *branches)
+
+    def while_do(self, loop: Stmt, B: Condition, S: Stmt, Q: Condition, where: str) -> HoareTriple:
+        I = self.invariants.get(loop)
+        if I is None:
+            raise ValueError(f"no invariant for the loop at {where}")
+        body = self.triple(S, I, f"{where}.body")
+
+        self.label, self.where = "invariant preserved", where
+        body = consequence(Conj(I, B), body, I)
+        HT = while_intro(I, B, body)
+        self.label, self.where = "invariant establishes postcondition", where
+        return consequence(I, HT, Q)
+
+def vcgen(stmt: Stmt, Q: Condition, invariants: Invariants,
+          P: Optional[Condition] = None) -> Tuple[HoareTriple, List[Obligation]]:
+    """
+    The triple {P} stmt {Q} (or {wp(stmt, Q)} stmt {Q} without `P`) and
+    the verification conditions it rests on. The triple only holds if
+    they do.
+    """
+    gen = _Gen(invariants)
+    outer = hoare.DEFER
+    hoare.DEFER = gen.record
+    try:
+        triple = gen.triple(stmt, Q, "S")
+        if P is not None:
+            gen.label, gen.where = "precondition", "S"
+            triple = consequence(P, triple, Q)
+    finally:
+        hoare.DEFER = outer
+    return triple, gen.obligations
+
+def verify_program(stmt: Stmt, P: Condition, Q: Condition, invariants: Invariants,
+                   backend: hoare.Backend = bitset_backend) -> Report:
+    """Checks {P} stmt {Q} and reports every verification condition that fails."""
+    _, obligations = vcgen(stmt, Q, invariants, P)
+    ctx = ProofContext()
+    ctx.obligations = obligations
+    return ctx.discharge(backend)